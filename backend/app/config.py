@@ -1,22 +1,100 @@
-import os
+from pathlib import Path
 from pydantic_settings import BaseSettings
-from dotenv import load_dotenv
 
-load_dotenv()
+BACKEND_DIR = Path(__file__).resolve().parent.parent
 
 class Settings(BaseSettings):
     # Security
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
+    SECRET_KEY: str = "dev-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    AUTH_CACHE_SIZE: int = 1024  # Authenticated users kept in memory; 0 disables the cache
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    BCRYPT_ROUNDS: int = 12  # Existing hashes at another cost are rehashed on their next login
+    PASSWORD_HASH_WORKERS: int = 2  # Threads for bcrypt; logins beyond this queue
+    LOGIN_FAILURE_BURST: int = 5  # Failed logins allowed per username...
+    LOGIN_IP_FAILURE_BURST: int = 20  # ...and per client IP (higher, for shared networks)...
+    LOGIN_FAILURE_REFILL_SECONDS: float = 30.0  # ...each regaining one attempt every this many seconds
+    ADMIN_USERNAMES: list = []  # JSON list, e.g. ["alice"]; admins can profile requests
 
     # Database
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./bachaboard.db")
+    DATABASE_URL: str = "sqlite:///./bachaboard.db"
+    DATABASE_ASYNC: bool = True  # Off: request handlers run the sync driver inline on the event loop
+    # Optional read replica for read-only routes (get_read_db); empty sends every query to the primary
+    DATABASE_READ_URL: str = ""
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # After a write, that user's reads stay on the primary this long
+    READ_REPLICA_RETRY_SECONDS: float = 30.0  # After the replica fails to connect, reads use the primary this long
+    # Connection pool per engine (Postgres, and sync connections to a SQLite file)
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT_SECONDS: float = 30.0
+    DATABASE_POOL_PRE_PING: bool = True  # Postgres only
+    DATABASE_POOL_RECYCLE_SECONDS: int = 1800  # Postgres only; -1 keeps connections forever
+    # SQLite pragmas, applied to every new connection
+    SQLITE_JOURNAL_MODE: str = "wal"  # "delete" is SQLite's rollback journal, where a writer blocks readers
+    SQLITE_SYNCHRONOUS: str = "normal"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    # Apply pending Alembic migrations in the lifespan hook. Turn off when several workers start
+    # at once and run `alembic upgrade head` (from backend/) as a release step instead.
+    MIGRATE_ON_STARTUP: bool = True
+
+    # Home timelines: fan out new posts into per-viewer rows instead of merging at read time.
+    # Run scripts/rebuild_timelines.py after turning this on for an existing database.
+    TIMELINE_FANOUT: bool = False
+    TIMELINE_FANOUT_MAX_FOLLOWERS: int = 5000  # Above this, an author's posts are merged at read time
+    TIMELINE_DEMOTE_INTERVAL_SECONDS: float = 60.0  # How often authors back under it are fanned out again
 
     # Cloudinary
-    CLOUDINARY_CLOUD_NAME: str = os.getenv("CLOUDINARY_CLOUD_NAME", "")
-    CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY", "")
-    CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
+    CLOUDINARY_CLOUD_NAME: str = ""
+    CLOUDINARY_API_KEY: str = ""
+    CLOUDINARY_API_SECRET: str = ""
+
+    # Media uploads: "cloudinary" or "local" (files under MEDIA_ROOT, served at MEDIA_URL)
+    STORAGE_BACKEND: str = "cloudinary"
+    MEDIA_ROOT: str = "./media"
+    MEDIA_URL: str = "/media"
+    STATIC_DIR: str = str(BACKEND_DIR / "static")  # The frontend build, served at / when present
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_CONCURRENCY: int = 4
+    UPLOAD_TIMEOUT_SECONDS: float = 30.0
+    DRAWING_MAX_DIMENSION: int = 4096  # Pixels, either side
+    IMAGE_WORKERS: int = 2  # Processes for image decoding and re-encoding
+
+    # Drawing drafts: auto-saved strokes are buffered in memory and written behind
+    DRAFT_FLUSH_INTERVAL_SECONDS: float = 2.0
+    DRAFT_MAX_PENDING_STROKES: int = 200  # Flush immediately once this many strokes are buffered
+    DRAFT_COMPACT_AFTER: int = 50  # Fold deltas into the base once a draft has this many
+
+    # Live updates pushed over /api/events/stream
+    EVENTS_BROKER: str = "memory"  # In-process only; see app/utils/events.Broker for other backends
+    EVENTS_MAX_PENDING: int = 100  # Per-connection queue; a client further behind gets a resync event
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    EVENTS_TICKET_SECONDS: int = 60  # How long a stream ticket (POST /api/events/ticket) may be used to connect
+
+    # Responses: JSON via orjson (msgpack on request); bodies at least this large are compressed
+    COMPRESSION_MIN_BYTES: int = 1024
+
+    # Prometheus metrics at /api/metrics; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+    METRICS_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
+
+    # Query diagnostics: statements slower than SLOW_QUERY_MS are logged with their route, redacted
+    # parameters and plan. Routes declare a query_budget; over it, a warning (or, strict, an error).
+    SLOW_QUERY_MS: float = 200.0  # 0 turns the slow-query log off
+    SLOW_QUERY_EXPLAIN: bool = True  # EXPLAIN (EXPLAIN QUERY PLAN on SQLite) logged SELECTs
+    QUERY_BUDGET_STRICT: bool = False  # Turn on in tests and CI so that N+1 regressions fail there
+
+    # Per-request profiling, off unless enabled (the middleware isn't even installed). Admins
+    # send "X-Profile: 1" (or ?profile=1), and every PROFILE_SAMPLE_EVERY-th request is profiled
+    # when that's above 0. Collapsed-stack reports go to PROFILE_DIR, listed at /api/profiles.
+    PROFILING_ENABLED: bool = False
+    PROFILE_SAMPLE_EVERY: int = 0
+    PROFILE_INTERVAL_MS: float = 2.0
+    PROFILE_DIR: str = "./profiles"
+    PROFILE_KEEP: int = 50  # Older reports are deleted
 
     # App settings
     APP_NAME: str = "BachaBoard"
@@ -24,10 +102,15 @@ class Settings(BaseSettings):
     CORS_ORIGINS: list = ["http://localhost:3000"]
 
     # Railway/Production
-    PORT: int = int(os.getenv("PORT", 8000))
-    RAILWAY_ENVIRONMENT: str = os.getenv("RAILWAY_ENVIRONMENT", "development")
+    PORT: int = 8000
+    RAILWAY_ENVIRONMENT: str = "development"
+    # Proxies trusted to report the client address in X-Forwarded-For (run.py), which the login
+    # rate limit keys on. "*" on Railway, where the edge proxy is the only way in.
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
 
     class Config:
-        env_file = ".env"
+        # Read once here; later files win (backend/.env over the repository root's)
+        env_file = (BACKEND_DIR.parent / ".env", BACKEND_DIR / ".env")
+        extra = "ignore"  # The root .env may also hold frontend variables
 
 settings = Settings()
\ No newline at end of file
@@ -1,25 +1,191 @@
-import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.config import settings
+
+def normalize_database_url(url: str) -> str:
+    # Fix for Railway PostgreSQL URLs (they use postgres:// but SQLAlchemy needs postgresql://)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
 # Database URL - will be set via environment variable
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./bachaboard.db")
+DATABASE_URL = normalize_database_url(settings.DATABASE_URL)
+DATABASE_READ_URL = normalize_database_url(settings.DATABASE_READ_URL) or None
+
+# Request handlers use the async driver (aiosqlite / asyncpg) unless this is turned off,
+# in which case they fall back to running the sync driver inline on the event loop
+DATABASE_ASYNC = settings.DATABASE_ASYNC
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto the matching async driver"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        url = url.split(":", 1)[1]
+        # asyncpg takes ssl=... rather than libpq's sslmode=...
+        return "postgresql+asyncpg:" + url.replace("sslmode=", "ssl=")
+    return url
+
+def engine_options(url: str) -> dict:
+    """create_engine keyword arguments for the URL's dialect"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:") or url.query.get("mode") == "memory":
+            return {}  # Keep SQLAlchemy's single shared connection for in-memory databases
+        if url.get_dialect().is_async:
+            # aiosqlite keeps its default NullPool: a pooled connection holds a non-daemon thread,
+            # which would keep scripts and test runs from exiting unless the engine is disposed
+            return {}
+        return {
+            "pool_size": settings.DATABASE_POOL_SIZE,
+            "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+            "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS,
+            # Pooled connections move between threads (run_in_threadpool, scripts)
+            "connect_args": {"check_same_thread": False},
+        }
+    if url.get_backend_name() == "postgresql":
+        return {
+            "pool_size": settings.DATABASE_POOL_SIZE,
+            "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+            "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS,
+            # Railway and other managed Postgres drop idle connections; test before use and retire old ones
+            "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+            "pool_recycle": settings.DATABASE_POOL_RECYCLE_SECONDS,
+        }
+    return {}
 
-# Fix for Railway PostgreSQL URLs (they use postgres:// but SQLAlchemy needs postgresql://)
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # Wait for a lock instead of failing with "database is locked" (set first; switching modes can wait)
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    # WAL lets readers carry on while one writer commits; in WAL mode NORMAL only syncs at checkpoints,
+    # so a power loss can drop the last commits but never corrupts the database
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_BYTES)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
-engine = create_engine(DATABASE_URL)
+def configure_engine(engine):
+    """Per-connection setup; engine is a sync Engine (or an AsyncEngine's sync_engine)"""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+# Sync engine for scripts and schema management
+engine = configure_engine(create_engine(DATABASE_URL, **engine_options(DATABASE_URL)))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+# Async engine for request handlers
+async_engine = create_async_engine(
+    async_database_url(DATABASE_URL), **engine_options(async_database_url(DATABASE_URL))
+) if DATABASE_ASYNC else None
+if async_engine is not None:
+    configure_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+) if DATABASE_ASYNC else None
+
+# Read replica engine, in whichever flavour request handlers use; sessions on it are marked
+# with info["replica"] so commit hooks can tell them apart
+read_engine = None
+ReadSessionLocal = None
+if DATABASE_READ_URL and DATABASE_ASYNC:
+    read_engine = create_async_engine(
+        async_database_url(DATABASE_READ_URL), **engine_options(async_database_url(DATABASE_READ_URL))
+    )
+    configure_engine(read_engine.sync_engine)
+    ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False, info={"replica": True})
+elif DATABASE_READ_URL:
+    read_engine = configure_engine(create_engine(DATABASE_READ_URL, **engine_options(DATABASE_READ_URL)))
+    ReadSessionLocal = sessionmaker(autoflush=False, bind=read_engine, info={"replica": True})
+
+async def dispose_engines():
+    """Close pooled connections (on shutdown)"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    if isinstance(read_engine, AsyncEngine):
+        await read_engine.dispose()
+    elif read_engine is not None:
+        read_engine.dispose()
+    engine.dispose()
+
+class BlockingSession:
+    """AsyncSession-compatible wrapper running a sync Session inline (used when DATABASE_ASYNC is off)"""
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def get_bind(self):
+        return self.sync_session.get_bind()
+
+    async def connection(self, *args, **kwargs):
+        return self.sync_session.connection(*args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        return self.sync_session.execute(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return self.sync_session.scalar(*args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return self.sync_session.scalars(*args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return self.sync_session.get(*args, **kwargs)
+
+    async def delete(self, instance):
+        self.sync_session.delete(instance)
+
+    async def flush(self):
+        self.sync_session.flush()
+
+    async def refresh(self, instance):
+        self.sync_session.refresh(instance)
+
+    async def commit(self):
+        self.sync_session.commit()
+
+    async def rollback(self):
+        self.sync_session.rollback()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        self.sync_session.close()
+
+def new_session():
+    """A request-style session (AsyncSession, or BlockingSession when DATABASE_ASYNC is off)"""
+    return AsyncSessionLocal() if DATABASE_ASYNC else BlockingSession(SessionLocal(expire_on_commit=False))
+
+def new_replica_session():
+    """A request-style session on the read replica (DATABASE_READ_URL must be set)"""
+    if DATABASE_ASYNC:
+        return ReadSessionLocal()
+    return BlockingSession(ReadSessionLocal(expire_on_commit=False))
+
+async def get_db():
+    db = new_session()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
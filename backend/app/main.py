@@ -1,15 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
-from app.routers import auth, posts, users, feedback, drawings
-from app.database import engine, Base
+from app.routers import auth, posts, users, feedback, drawings, events, profiles, monitoring
+from app.config import settings
+from app.database import async_engine, dispose_engines, engine, read_engine
+from app.utils.drafts import draft_store
+from app.utils.metrics import MetricsMiddleware, instrument_engine, sample_event_loop_lag
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.queries import QueryTrackingMiddleware, instrument_queries
+from app.utils.schema import upgrade_schema
+from app.utils.serialization import CompressionMiddleware, ContentNegotiationMiddleware, NegotiatedResponse
+from app.utils.storage import UploadLimitMiddleware
+from app.utils.timeline import run_demotions
+from app.utils.workers import shutdown_workers
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Importing this module must stay cheap and free of I/O: no database connections or schema
+# work, which belong in the lifespan hook (scripts/check_import_time.py keeps it that way)
 
-app = FastAPI(title="BachaBoard API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.MIGRATE_ON_STARTUP:
+        await asyncio.to_thread(upgrade_schema)
+    if settings.STORAGE_BACKEND == "local":
+        Path(settings.MEDIA_ROOT).mkdir(parents=True, exist_ok=True)
+    background = [asyncio.create_task(draft_store.run_flusher())]
+    if settings.TIMELINE_FANOUT:
+        background.append(asyncio.create_task(run_demotions()))
+    if settings.METRICS_ENABLED:
+        background.append(asyncio.create_task(sample_event_loop_lag(settings.METRICS_LOOP_LAG_INTERVAL_SECONDS)))
+    yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await draft_store.flush_due(force=True)
+    shutdown_workers()
+    await dispose_engines()
+
+app = FastAPI(
+    title="BachaBoard API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=NegotiatedResponse
+)
+
+# Reject oversized uploads before their body is read (allowing for multipart framing)
+app.add_middleware(UploadLimitMiddleware, max_body=settings.MAX_UPLOAD_BYTES + 64 * 1024)
+
+# Response encoding: msgpack negotiation and gzip/brotli
+app.add_middleware(ContentNegotiationMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
 
 # CORS configuration
 app.add_middleware(
@@ -18,20 +62,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Profile"],
 )
 
+# Opt-in request profiling; when disabled it costs nothing, not even a header check
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_every=settings.PROFILE_SAMPLE_EVERY,
+        interval=settings.PROFILE_INTERVAL_MS / 1000
+    )
+
+# SQL per request: slow-query log and query budgets
+app.add_middleware(QueryTrackingMiddleware)
+sync_engines = {"primary": engine}
+if async_engine is not None:
+    sync_engines["primary_async"] = async_engine.sync_engine
+if read_engine is not None:
+    sync_engines["replica"] = getattr(read_engine, "sync_engine", read_engine)
+for sync_engine in sync_engines.values():
+    instrument_queries(sync_engine)
+
+# Request and SQL metrics (outermost, so that compression and CORS count toward latency)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    for name, sync_engine in sync_engines.items():
+        instrument_engine(sync_engine, name)
+
 # API Routes
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
 app.include_router(drawings.router, prefix="/api/drawings", tags=["drawings"])
 app.include_router(feedback.router, prefix="/api/feedback", tags=["feedback"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["profiles"])
+app.include_router(monitoring.router, prefix="/api", tags=["monitoring"])
 
-# Serve static files (React build) in production
-static_path = Path(__file__).parent.parent / "static"
+# Serve uploaded media when using the local storage backend
+if settings.STORAGE_BACKEND == "local":
+    # The directory is created in lifespan
+    app.mount(settings.MEDIA_URL, StaticFiles(directory=settings.MEDIA_ROOT, check_dir=False), name="media")
+
+# Serve static files (React build) in production. Mounted at "/", it matches every path, so
+# routes registered after it would never be reached: keep it last.
+static_path = Path(settings.STATIC_DIR)
 if static_path.exists():
     app.mount("/", StaticFiles(directory=str(static_path), html=True), name="static")
-
-@app.get("/api/health")
-async def health_check():
-    return {"status": "healthy", "service": "BachaBoard API"}
\ No newline at end of file
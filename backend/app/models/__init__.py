@@ -1,7 +1,9 @@
 from .user import User, ThemeType
 from .post import Post, PostType
 from .comment import Comment
-from .reaction import Reaction
+from .reaction import Reaction, PostReactionCount
 from .feedback import Feedback
+from .timeline import TimelineEntry, HighFanoutAuthor
+from .draft import DrawingDraft, DrawingDraftDelta
 
-__all__ = ["User", "ThemeType", "Post", "PostType", "Comment", "Reaction", "Feedback"]
\ No newline at end of file
+__all__ = ["User", "ThemeType", "Post", "PostType", "Comment", "Reaction", "PostReactionCount", "Feedback", "TimelineEntry", "HighFanoutAuthor", "DrawingDraft", "DrawingDraftDelta"]
\ No newline at end of file
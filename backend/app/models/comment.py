@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -15,4 +15,11 @@ class Comment(Base):
 
     # Relationships
     post = relationship("Post", back_populates="comments")
-    author = relationship("User", back_populates="comments")
\ No newline at end of file
+    author = relationship("User", back_populates="comments")
+
+    # Serves per-post comment pages and previews, newest first
+    # (author_id is a foreign key, which Postgres doesn't index on its own)
+    __table_args__ = (
+        Index("ix_comments_post_created", "post_id", "created_at", "id"),
+        Index("ix_comments_author_id", "author_id"),
+    )
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from datetime import datetime
+
+from app.database import Base
+
+# A user's in-progress drawing: a compacted base plus the stroke deltas appended since
+class DrawingDraft(Base):
+    __tablename__ = "drawing_drafts"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    base_data = Column(Text, nullable=True)  # Canvas state JSON as of base_seq
+    base_seq = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DrawingDraftDelta(Base):
+    __tablename__ = "drawing_draft_deltas"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    seq = Column(Integer, primary_key=True)  # Last client sequence number covered by this row
+    strokes = Column(Text, nullable=False)  # JSON list of strokes appended since the previous row
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -15,4 +15,7 @@ class Feedback(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    user = relationship("User", back_populates="feedbacks")
\ No newline at end of file
+    user = relationship("User", back_populates="feedbacks")
+
+    # The feedback list reads one user's rows
+    __table_args__ = (Index("ix_feedbacks_user_created", "user_id", "created_at"),)
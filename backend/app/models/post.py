@@ -1,9 +1,21 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index, LargeBinary, TypeDecorator
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 import enum
 
 from app.database import Base
+from app.utils import stroke_codec
+
+class StrokeData(TypeDecorator):
+    """Canvas state JSON in Python, stroke_codec binary in the database"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return stroke_codec.encode(value) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return stroke_codec.decode(value) if value is not None else None
 
 class PostType(enum.Enum):
     TEXT = "text"
@@ -18,11 +30,16 @@ class Post(Base):
     post_type = Column(Enum(PostType), nullable=False)
     content = Column(Text, nullable=True)  # For text posts
     media_url = Column(String, nullable=True)  # For photos and drawings
-    drawing_data = Column(Text, nullable=True)  # JSON data for canvas state
+    drawing_data = deferred(Column(StrokeData, nullable=True))  # Canvas state; only loaded on request
+    comments_count = Column(Integer, nullable=False, default=0, server_default="0")  # Maintained by add_comment
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     author = relationship("User", back_populates="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
-    reactions = relationship("Reaction", back_populates="post", cascade="all, delete-orphan")
\ No newline at end of file
+    reactions = relationship("Reaction", back_populates="post", cascade="all, delete-orphan")
+    reaction_counts = relationship("PostReactionCount", back_populates="post", cascade="all, delete-orphan")
+
+    # Feed reads filter by author and page by (created_at, id)
+    __table_args__ = (Index("ix_posts_author_created", "author_id", "created_at", "id"),)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -17,5 +17,22 @@ class Reaction(Base):
     post = relationship("Post", back_populates="reactions")
     user = relationship("User", back_populates="reactions")
 
-    # Ensure one reaction per user per post
-    __table_args__ = (UniqueConstraint('post_id', 'user_id', name='_post_user_uc'),)
\ No newline at end of file
+    # Ensure one reaction per user per post; the unique index also serves lookups by post.
+    # user_id gets its own, since Postgres doesn't index foreign keys.
+    __table_args__ = (
+        UniqueConstraint('post_id', 'user_id', name='_post_user_uc'),
+        Index('ix_reactions_user_id', 'user_id'),
+    )
+
+# Denormalized per-emoji reaction totals, maintained alongside Reaction writes
+class PostReactionCount(Base):
+    __tablename__ = "post_reaction_counts"
+
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    emoji = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    # The earliest reaction with this emoji, so summaries list emojis in the order they appeared
+    first_reaction_id = Column(Integer, nullable=True)
+
+    # Relationships
+    post = relationship("Post", back_populates="reaction_counts")
\ No newline at end of file
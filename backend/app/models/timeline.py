@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+
+from app.database import Base
+
+# One row per (viewer, post) in a materialized home timeline
+class TimelineEntry(Base):
+    __tablename__ = "timeline_entries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, nullable=False)  # Copied from the post for ordering
+
+    __table_args__ = (
+        # Feed reads are a range scan over one viewer's timeline
+        Index("ix_timeline_user_created", "user_id", "created_at", "post_id"),
+        # Unfollow prunes one author's posts from one viewer's timeline
+        Index("ix_timeline_user_author", "user_id", "author_id"),
+    )
+
+# Authors with too many followers to fan out; their posts are merged in at read time
+class HighFanoutAuthor(Base):
+    __tablename__ = "high_fanout_authors"
+
+    author_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, Table, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Table, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -9,8 +9,10 @@ from app.database import Base
 followers = Table(
     'followers',
     Base.metadata,
-    Column('follower_id', Integer, ForeignKey('users.id')),
-    Column('followed_id', Integer, ForeignKey('users.id'))
+    Column('follower_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('followed_id', Integer, ForeignKey('users.id'), primary_key=True),
+    # The primary key serves "who does X follow"; this serves "who follows X"
+    Index('ix_followers_followed_follower', 'followed_id', 'follower_id')
 )
 
 class ThemeType(enum.Enum):
@@ -43,4 +45,10 @@ class User(Base):
         primaryjoin=(followers.c.follower_id == id),
         secondaryjoin=(followers.c.followed_id == id),
         backref="followers"
+    )
+
+    # Case-insensitive prefix search for the user directory
+    __table_args__ = (
+        Index("ix_users_username_lower", func.lower(username)),
+        Index("ix_users_display_name_lower", func.lower(display_name)),
     )
\ No newline at end of file
@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from app.database import get_db
 from app.models import User, ThemeType
-from app.utils.auth import verify_password, get_password_hash, create_access_token, get_current_user
+from app.utils.auth import (
+    check_password, hash_password, create_access_token, get_current_user,
+    ip_login_limiter, username_login_limiter, Principal
+)
+from app.utils.rate_limit import refund_limits, reserve_limits
 
 router = APIRouter()
 
@@ -32,19 +37,37 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    limits = [
+        (username_login_limiter, form_data.username.lower()),
+        (ip_login_limiter, request.client.host if request.client else None),
+    ]
+    # Every attempt is paid for up front and refunded if it succeeds, so only failures count
+    reserve_limits(*limits)
+
+    user = await db.scalar(select(User).where(User.username == form_data.username))
+    valid, new_hash = await check_password(form_data.password, user.hashed_password if user else None)
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    refund_limits(*limits)
+
+    # Transparently move the stored hash to the current BCRYPT_ROUNDS
+    if new_hash:
+        user.hashed_password = new_hash
+
     # Update last login
     user.last_login = datetime.utcnow()
-    db.commit()
+    await db.commit()
 
     access_token = create_access_token(data={"sub": user.username})
     user_data = {
@@ -58,9 +81,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     return {"access_token": access_token, "token_type": "bearer", "user": user_data}
 
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = await db.scalar(select(User.id).where(User.username == user_data.username))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -70,17 +93,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     # Create new user
     new_user = User(
         username=user_data.username,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await hash_password(user_data.password),
         display_name=user_data.display_name,
         theme=user_data.theme
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return new_user
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: Principal = Depends(get_current_user)):
     return current_user
\ No newline at end of file
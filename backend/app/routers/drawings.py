@@ -1,15 +1,15 @@
-import json
 import base64
 from io import BytesIO
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel
-from PIL import Image
 
-from app.database import get_db
-from app.models import User
-from app.utils.auth import get_current_user
-from app.utils.cloudinary import upload_drawing
+from app.config import settings
+from app.utils.auth import get_current_user, Principal
+from app.utils.drafts import DraftSequenceError, draft_store
+from app.utils.images import png_dimensions, reencode_png
+from app.utils.storage import read_upload, upload_drawing
+from app.utils.workers import run_in_process
 
 router = APIRouter()
 
@@ -17,41 +17,86 @@ class DrawingSave(BaseModel):
     drawing_data: str  # Canvas state as JSON
     image_data: str  # Base64 encoded image
 
+class DraftAppend(BaseModel):
+    seq: int  # Client counter, one higher than the previous auto-save
+    strokes: List[dict] = []  # Lines drawn since the previous auto-save
+    base: Optional[dict] = None  # Full canvas state, replacing the draft (after undo or clear)
+
+class DraftResponse(BaseModel):
+    seq: int
+    drawing_data: Optional[str]  # Merged canvas state as JSON
+
 class DrawingResponse(BaseModel):
     drawing_data: str
     image_url: str
 
+async def _prepare_png(data: bytes) -> bytes:
+    dimensions = png_dimensions(data)
+    if dimensions and max(dimensions) <= settings.DRAWING_MAX_DIMENSION:
+        # Already a PNG within limits: upload the client's bytes as they are
+        return data
+    return await run_in_process(reencode_png, data, settings.DRAWING_MAX_DIMENSION)
+
+async def _save_drawing_image(data: bytes, drawing_data: str, user_id: int) -> dict:
+    if len(data) > settings.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Drawing is too large")
+
+    try:
+        png = await _prepare_png(data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to save drawing: {str(e)}")
+
+    # Upload to the configured storage backend
+    image_url = await upload_drawing(BytesIO(png), f"drawing_{user_id}")
+
+    return {
+        "image_url": image_url,
+        "drawing_data": drawing_data
+    }
+
 @router.post("/save", response_model=dict)
 async def save_drawing(
     drawing: DrawingSave,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     try:
-        # Convert base64 to image
+        # Convert base64 to image bytes
         image_data = drawing.image_data.split(',')[1] if ',' in drawing.image_data else drawing.image_data
-        image = Image.open(BytesIO(base64.b64decode(image_data)))
-
-        # Save to temporary file
-        temp_buffer = BytesIO()
-        image.save(temp_buffer, format='PNG')
-        temp_buffer.seek(0)
-
-        # Upload to Cloudinary
-        image_url = await upload_drawing(temp_buffer, f"drawing_{current_user.id}")
-
-        return {
-            "image_url": image_url,
-            "drawing_data": drawing.drawing_data
-        }
+        data = base64.b64decode(image_data)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to save drawing: {str(e)}")
 
+    return await _save_drawing_image(data, drawing.drawing_data, current_user.id)
+
+@router.post("/upload", response_model=dict)
+async def upload_drawing_file(
+    image: UploadFile = File(...),
+    drawing_data: str = Form(...),
+    current_user: Principal = Depends(get_current_user)
+):
+    # Binary variant of /save: the PNG arrives as a multipart file instead of base64 JSON
+    data = await read_upload(image)
+    return await _save_drawing_image(data, drawing_data, current_user.id)
+
 @router.post("/auto-save", response_model=dict)
 async def auto_save_drawing(
-    drawing_data: dict,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    draft: DraftAppend,
+    current_user: Principal = Depends(get_current_user)
 ):
-    # Store drawing data temporarily (could use Redis in production)
-    # For now, we'll just return success
-    return {"message": "Drawing auto-saved"}
\ No newline at end of file
+    try:
+        seq = await draft_store.append(current_user.id, draft.seq, draft.strokes, base=draft.base)
+    except DraftSequenceError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Draft is out of sync; resend the full canvas as base", "expected_seq": e.expected_seq}
+        )
+    return {"message": "Drawing auto-saved", "seq": seq}
+
+@router.get("/draft", response_model=DraftResponse)
+async def resume_draft(current_user: Principal = Depends(get_current_user)):
+    return await draft_store.resume(current_user.id)
+
+@router.delete("/draft", response_model=dict)
+async def discard_draft(current_user: Principal = Depends(get_current_user)):
+    await draft_store.discard(current_user.id)
+    return {"message": "Draft discarded"}
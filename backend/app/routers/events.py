@@ -0,0 +1,82 @@
+import json
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import new_session
+from app.models.user import followers
+from app.utils.auth import (
+    create_stream_ticket, credentials_exception, get_current_user, load_principal, oauth2_scheme,
+    stream_ticket_claims, token_claims, token_username, Principal
+)
+from app.utils.events import author_topic, event_broker
+
+router = APIRouter()
+
+def _stream_credentials(request: Request, ticket: Optional[str]) -> tuple:
+    """(username, when the stream must close) from a bearer header or, for EventSource, a ticket"""
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+        if token_username(token) is None:
+            raise credentials_exception()
+        claims = token_claims(token)
+        return claims["sub"], claims["exp"]
+    if ticket:
+        claims = stream_ticket_claims(ticket)
+        if claims is None:
+            raise credentials_exception()
+        return claims["sub"], claims["access_exp"]
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _format(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+@router.post("/ticket", response_model=dict)
+async def create_ticket(token: str = Depends(oauth2_scheme), current_user: Principal = Depends(get_current_user)):
+    """A short-lived ticket for opening /stream with EventSource: GET /api/events/stream?ticket=..."""
+    return {"ticket": create_stream_ticket(token_claims(token)), "expires_in": settings.EVENTS_TICKET_SECONDS}
+
+@router.get("/stream")
+async def stream_events(request: Request, ticket: Optional[str] = Query(None)):
+    """Server-sent events for posts, comments and reactions by the user and the people they follow.
+
+    The stream ends with an "expired" event when the access token behind it expires; clients
+    reconnect with a fresh token or ticket.
+    """
+    username, closes_at = _stream_credentials(request, ticket)
+    # Use a short-lived session so no connection is held for the life of the stream
+    async with new_session() as db:
+        principal = await load_principal(username, db)
+        followed_ids = await db.scalars(
+            select(followers.c.followed_id).where(followers.c.follower_id == principal.id)
+        )
+        topics = [author_topic(principal.id)] + [author_topic(author_id) for author_id in followed_ids]
+
+    subscription = event_broker.subscribe(principal.id, topics)
+
+    async def events():
+        try:
+            yield _format({"type": "ready"})
+            while not await request.is_disconnected():
+                remaining = closes_at - time.time()
+                if remaining <= 0:
+                    yield _format({"type": "expired"})
+                    break
+                event = await subscription.next_event(min(settings.EVENTS_HEARTBEAT_SECONDS, remaining))
+                # A comment line keeps proxies from closing an idle stream
+                yield _format(event) if event is not None else ": ping\n\n"
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
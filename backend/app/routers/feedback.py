@@ -1,12 +1,16 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from pydantic import BaseModel
 from datetime import datetime
 
 from app.database import get_db
-from app.models import User, Feedback
-from app.utils.auth import get_current_user
+from app.models import Feedback
+from app.utils.auth import get_current_user, Principal
+from app.utils.queries import query_budget
+from app.utils.replica import get_read_db
 
 router = APIRouter()
 
@@ -29,8 +33,8 @@ class FeedbackResponse(BaseModel):
 @router.post("/", response_model=dict)
 async def submit_feedback(
     feedback_data: FeedbackCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     new_feedback = Feedback(
         user_id=current_user.id,
@@ -40,18 +44,20 @@ async def submit_feedback(
     )
 
     db.add(new_feedback)
-    db.commit()
+    await db.commit()
 
     return {"message": "Thank you for your feedback!"}
 
-@router.get("/", response_model=List[FeedbackResponse])
+@router.get("/", response_model=List[FeedbackResponse], dependencies=[Depends(query_budget(4))])
 async def get_all_feedback(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Only admin users can see all feedback
     # For now, we'll let everyone see their own feedback
-    feedbacks = db.query(Feedback).filter(Feedback.user_id == current_user.id).all()
+    feedbacks = await db.scalars(
+        select(Feedback).options(joinedload(Feedback.user)).where(Feedback.user_id == current_user.id)
+    )
 
     return [
         {
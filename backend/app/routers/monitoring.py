@@ -0,0 +1,32 @@
+import secrets
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from app.config import settings
+from app.utils.auth import principal_cache
+from app.utils.events import event_broker
+from app.utils.metrics import render_metrics
+from app.utils.replica import replica_stats
+
+router = APIRouter()
+
+@router.get("/health")
+async def health_check():
+    return {
+        "status": "healthy",
+        "service": "BachaBoard API",
+        "auth_cache": principal_cache.stats(),
+        "events": event_broker.stats(),
+        "reads": replica_stats()
+    }
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text format"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
@@ -1,14 +1,26 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy import desc, func, select
+from pydantic import BaseModel, Field
 from datetime import datetime
 
+from app.config import settings
 from app.database import get_db
-from app.models import User, Post, PostType, Comment, Reaction
-from app.utils.auth import get_current_user
-from app.utils.cloudinary import upload_image
+from app.models import Post, PostType, Comment, User
+from app.utils.auth import get_current_user, Principal
+from app.utils.storage import upload_image
+from app.utils.counters import adjust_comments_count
+from app.utils.events import author_topic, event_broker
+from app.utils.feed import feed_query, hydrate_post, hydrate_posts, page_version, visible_authors_filter
+from app.utils.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from app.utils.pagination import keyset_before, next_cursor
+from app.utils.queries import query_budget
+from app.utils.reactions import PostNotFound, write_reaction
+from app.utils.replica import get_read_db
+from app.utils.serialization import unvalidated
+from app.utils.timeline import fan_out_post, timeline_page
 
 router = APIRouter()
 
@@ -24,6 +36,13 @@ class CommentCreate(BaseModel):
 class ReactionCreate(BaseModel):
     emoji: str
 
+class ReactionChange(BaseModel):
+    post_id: int
+    emoji: Optional[str] = None  # None clears the reaction
+
+class ReactionBatch(BaseModel):
+    changes: List[ReactionChange] = Field(..., min_length=1, max_length=100)
+
 class PostResponse(BaseModel):
     id: int
     author_id: int
@@ -40,54 +59,59 @@ class PostResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.get("/feed", response_model=List[PostResponse])
+class DrawingDataResponse(BaseModel):
+    drawing_data: Optional[str]  # Canvas state JSON
+
+async def _feed_page(
+    db: AsyncSession, viewer_id: int, limit: int, skip: int, cursor: Optional[str], version_only: bool = False
+) -> List[Post]:
+    if settings.TIMELINE_FANOUT:
+        return await timeline_page(db, viewer_id, limit, skip=skip, cursor=cursor, version_only=version_only)
+
+    # Get posts from users the current user follows (including their own)
+    query = feed_query(version_only).where(visible_authors_filter(viewer_id))\
+        .order_by(desc(Post.created_at), desc(Post.id))
+
+    # Cursor mode seeks past the last seen (created_at, id); skip is the legacy offset mode
+    if cursor:
+        query = query.where(keyset_before(Post.created_at, Post.id, cursor))
+    else:
+        query = query.offset(skip)
+    return (await db.scalars(query.limit(limit))).all()
+
+@router.get("/feed", response_model=List[PostResponse], dependencies=[Depends(query_budget(8))])
 async def get_feed(
+    request: Request,
+    response: Response,
     skip: int = 0,
-    limit: int = 20,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Get posts from users the current user follows (including their own)
-    following_ids = [u.id for u in current_user.following] + [current_user.id]
-
-    posts = db.query(Post).filter(Post.author_id.in_(following_ids))\
-        .order_by(desc(Post.created_at))\
-        .offset(skip).limit(limit).all()
-
-    response = []
-    for post in posts:
-        reactions_summary = {}
-        user_reaction = None
-
-        for reaction in post.reactions:
-            if reaction.emoji not in reactions_summary:
-                reactions_summary[reaction.emoji] = 0
-            reactions_summary[reaction.emoji] += 1
-
-            if reaction.user_id == current_user.id:
-                user_reaction = reaction.emoji
-
-        response.append({
-            "id": post.id,
-            "author_id": post.author_id,
-            "author_name": post.author.display_name,
-            "author_avatar": post.author.avatar_url,
-            "post_type": post.post_type,
-            "content": post.content,
-            "media_url": post.media_url,
-            "created_at": post.created_at,
-            "comments_count": len(post.comments),
-            "reactions": [{"emoji": k, "count": v} for k, v in reactions_summary.items()],
-            "user_reaction": user_reaction
-        })
-
-    return response
+    if request.headers.get("if-none-match"):
+        # Revalidation: compare versions without loading content or reactions
+        versions = await _feed_page(db, current_user.id, limit, skip, cursor, version_only=True)
+        etag = make_etag(current_user.id, page_version(versions))
+        if etag_matches(request, etag):
+            page_cursor = next_cursor(versions, limit)
+            return not_modified(etag, {"X-Next-Cursor": page_cursor} if page_cursor else None)
+
+    posts = await _feed_page(db, current_user.id, limit, skip, cursor)
+
+    page_cursor = next_cursor(posts, limit)
+    if page_cursor:
+        response.headers["X-Next-Cursor"] = page_cursor
+    cache_headers(response, make_etag(current_user.id, page_version(posts)))
+
+    # hydrate_posts builds PostResponse-shaped dicts, so skip re-validating them
+    return unvalidated(await hydrate_posts(db, posts, current_user.id), response)
 
 @router.post("/", response_model=dict)
 async def create_post(
     post_data: PostCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     new_post = Post(
         author_id=current_user.id,
@@ -98,64 +122,107 @@ async def create_post(
     )
 
     db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
-
+    if settings.TIMELINE_FANOUT:
+        await db.flush()
+        await fan_out_post(db, new_post)
+    await db.commit()
+
+    await event_broker.publish(author_topic(current_user.id), {
+        "type": "post", "post_id": new_post.id, "author_id": current_user.id
+    })
     return {"id": new_post.id, "message": "Post created successfully"}
 
 @router.post("/upload-image", response_model=dict)
 async def upload_post_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    # Upload to Cloudinary
+    # Upload to the configured storage backend
     url = await upload_image(file, folder="posts")
     return {"url": url}
 
-@router.get("/{post_id}", response_model=PostResponse)
+def _comment_response(comment: Comment) -> dict:
+    return {
+        "id": comment.id,
+        "author_name": comment.author.display_name,
+        "author_avatar": comment.author.avatar_url,
+        "content": comment.content,
+        "created_at": comment.created_at
+    }
+
+@router.get("/comments/preview", response_model=dict, dependencies=[Depends(query_budget(4))])
+async def preview_comments(
+    post_ids: List[int] = Query([]),
+    k: int = Query(3, ge=1, le=20),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Latest k comments for each of several posts, in one query"""
+    if not 1 <= len(post_ids) <= 100:
+        raise HTTPException(status_code=400, detail="Pass between 1 and 100 post_ids")
+
+    ranked = select(
+        Comment.id,
+        func.row_number().over(
+            partition_by=Comment.post_id, order_by=(desc(Comment.created_at), desc(Comment.id))
+        ).label("rank")
+    ).where(Comment.post_id.in_(post_ids)).subquery()
+
+    comments = await db.scalars(
+        select(Comment).options(joinedload(Comment.author))
+        .join(ranked, ranked.c.id == Comment.id)
+        .where(ranked.c.rank <= k)
+        .order_by(desc(Comment.created_at), desc(Comment.id))
+    )
+
+    previews = {post_id: [] for post_id in post_ids}
+    for comment in comments:
+        previews[comment.post_id].append(_comment_response(comment))
+    return previews
+
+@router.get("/{post_id}", response_model=PostResponse, dependencies=[Depends(query_budget(6))])
 async def get_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
+    if request.headers.get("if-none-match"):
+        version = await db.scalar(feed_query(version_only=True).where(Post.id == post_id))
+        if version is not None:
+            etag = make_etag(current_user.id, page_version([version]))
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+    post = await db.scalar(feed_query().where(Post.id == post_id))
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    reactions_summary = {}
-    user_reaction = None
-
-    for reaction in post.reactions:
-        if reaction.emoji not in reactions_summary:
-            reactions_summary[reaction.emoji] = 0
-        reactions_summary[reaction.emoji] += 1
+    cache_headers(response, make_etag(current_user.id, page_version([post])))
+    return unvalidated(await hydrate_post(db, post, current_user.id), response)
 
-        if reaction.user_id == current_user.id:
-            user_reaction = reaction.emoji
+@router.get("/{post_id}/drawing", response_model=DrawingDataResponse, dependencies=[Depends(query_budget(3))])
+async def get_post_drawing(
+    post_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    row = (await db.execute(select(Post.id, Post.drawing_data).where(Post.id == post_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Post not found")
 
-    return {
-        "id": post.id,
-        "author_id": post.author_id,
-        "author_name": post.author.display_name,
-        "author_avatar": post.author.avatar_url,
-        "post_type": post.post_type,
-        "content": post.content,
-        "media_url": post.media_url,
-        "created_at": post.created_at,
-        "comments_count": len(post.comments),
-        "reactions": [{"emoji": k, "count": v} for k, v in reactions_summary.items()],
-        "user_reaction": user_reaction
-    }
+    return {"drawing_data": row.drawing_data}
 
-@router.post("/{post_id}/comment", response_model=dict)
+@router.post("/{post_id}/comment", response_model=dict, dependencies=[Depends(query_budget(6))])
 async def add_comment(
     post_id: int,
     comment_data: CommentCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    post_author_id = await db.scalar(select(Post.author_id).where(Post.id == post_id))
+    if post_author_id is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
     new_comment = Comment(
@@ -165,64 +232,102 @@ async def add_comment(
     )
 
     db.add(new_comment)
-    db.commit()
+    await adjust_comments_count(db, post_id, 1)
+    await db.commit()
 
+    await event_broker.publish(author_topic(post_author_id), {
+        "type": "comment", "post_id": post_id, "comment_id": new_comment.id, "user_id": current_user.id
+    })
     return {"message": "Comment added successfully"}
 
-@router.post("/{post_id}/react", response_model=dict)
+async def _publish_reaction(post_author_id: int, post_id: int, user_id: int, emoji: Optional[str], outcome: str):
+    await event_broker.publish(author_topic(post_author_id), {
+        "type": "reaction", "post_id": post_id, "user_id": user_id,
+        "emoji": emoji, "status": outcome
+    })
+
+@router.post("/reactions/batch", response_model=dict)
+async def batch_reactions(
+    batch: ReactionBatch,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Apply queued reaction changes in order, in one transaction (emoji=null clears a reaction)"""
+    results = []
+    for change in batch.changes:
+        try:
+            outcome = await write_reaction(db, change.post_id, current_user.id, change.emoji)
+        except PostNotFound:
+            outcome = "not_found"
+        results.append({"post_id": change.post_id, "emoji": change.emoji, "status": outcome})
+
+    await db.commit()
+
+    changed = [r for r in results if r["status"] in ("added", "updated", "removed")]
+    if changed:
+        authors = dict((await db.execute(
+            select(Post.id, Post.author_id).where(Post.id.in_({r["post_id"] for r in changed}))
+        )).all())
+        for result in changed:
+            await _publish_reaction(authors[result["post_id"]], result["post_id"], current_user.id,
+                                    result["emoji"], result["status"])
+    return {"results": results}
+
+@router.post("/{post_id}/react", response_model=dict, dependencies=[Depends(query_budget(8))])
 async def toggle_reaction(
     post_id: int,
     reaction_data: ReactionCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    try:
+        outcome = await write_reaction(db, post_id, current_user.id, reaction_data.emoji, toggle=True)
+    except PostNotFound:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    # Check if reaction exists
-    existing_reaction = db.query(Reaction).filter(
-        Reaction.post_id == post_id,
-        Reaction.user_id == current_user.id
-    ).first()
-
-    if existing_reaction:
-        if existing_reaction.emoji == reaction_data.emoji:
-            # Remove reaction if same emoji
-            db.delete(existing_reaction)
-            message = "Reaction removed"
-        else:
-            # Update to new emoji
-            existing_reaction.emoji = reaction_data.emoji
-            message = "Reaction updated"
-    else:
-        # Add new reaction
-        new_reaction = Reaction(
-            post_id=post_id,
-            user_id=current_user.id,
-            emoji=reaction_data.emoji
-        )
-        db.add(new_reaction)
-        message = "Reaction added"
-
-    db.commit()
-    return {"message": message}
-
-@router.get("/{post_id}/comments", response_model=list)
+    await db.commit()
+
+    post_author_id = await db.scalar(select(Post.author_id).where(Post.id == post_id))
+    await _publish_reaction(post_author_id, post_id, current_user.id, reaction_data.emoji, outcome)
+    return {"message": f"Reaction {outcome}"}
+
+def _comments_page(post_id: int, limit: int, cursor: Optional[str], *columns):
+    query = select(*columns).join(User, User.id == Comment.author_id)\
+        .where(Comment.post_id == post_id)\
+        .order_by(desc(Comment.created_at), desc(Comment.id))
+    if cursor:
+        query = query.where(keyset_before(Comment.created_at, Comment.id, cursor))
+    return query.limit(limit)
+
+@router.get("/{post_id}/comments", response_model=list, dependencies=[Depends(query_budget(4))])
 async def get_comments(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    comments = db.query(Comment).filter(Comment.post_id == post_id)\
-        .order_by(desc(Comment.created_at)).all()
-
-    return [
-        {
-            "id": c.id,
-            "author_name": c.author.display_name,
-            "author_avatar": c.author.avatar_url,
-            "content": c.content,
-            "created_at": c.created_at
-        } for c in comments
-    ]
\ No newline at end of file
+    if request.headers.get("if-none-match"):
+        # Comments are never edited, so ids plus author details identify a page
+        versions = (await db.execute(_comments_page(
+            post_id, limit, cursor, Comment.id, Comment.created_at, User.display_name, User.avatar_url
+        ))).all()
+        etag = make_etag([tuple(row) for row in versions])
+        if etag_matches(request, etag):
+            page_cursor = next_cursor(versions, limit)
+            return not_modified(etag, {"X-Next-Cursor": page_cursor} if page_cursor else None)
+
+    comments = (await db.scalars(
+        _comments_page(post_id, limit, cursor, Comment).options(contains_eager(Comment.author))
+    )).all()
+
+    page_cursor = next_cursor(comments, limit)
+    if page_cursor:
+        response.headers["X-Next-Cursor"] = page_cursor
+    cache_headers(response, make_etag([
+        (c.id, c.created_at, c.author.display_name, c.author.avatar_url) for c in comments
+    ]))
+
+    return [_comment_response(c) for c in comments]
@@ -0,0 +1,33 @@
+import asyncio
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from datetime import datetime
+
+from app.utils.auth import get_admin_user, Principal
+from app.utils.profiling import list_profiles, profile_path
+
+router = APIRouter()
+
+class ProfileSummary(BaseModel):
+    name: str
+    id: str  # Sent in the profiled response's X-Profile header
+    method: str
+    route: str
+    duration_ms: int
+    created_at: datetime
+    size: int
+
+@router.get("/", response_model=List[ProfileSummary])
+async def get_profiles(admin: Principal = Depends(get_admin_user)):
+    """Recent request profiles, newest first"""
+    return await asyncio.to_thread(list_profiles)
+
+@router.get("/{name}")
+async def download_profile(name: str, admin: Principal = Depends(get_admin_user)):
+    """A profile in collapsed-stack format, e.g. for `flamegraph.pl` or speedscope.app"""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -1,14 +1,70 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, delete, exists, func, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
 
+from app.config import settings
 from app.database import get_db
 from app.models import User, ThemeType
-from app.utils.auth import get_current_user
+from app.models.user import followers
+from app.utils.auth import Principal, get_current_user, invalidate_principal
+from app.utils.events import author_topic, event_broker
+from app.utils.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from app.utils.pagination import decode_id_cursor, encode_id_cursor
+from app.utils.queries import query_budget
+from app.utils.replica import get_read_db
+from app.utils.sql import upsert_insert
+from app.utils.timeline import backfill_follow, prune_unfollow
 
 router = APIRouter()
 
+async def _following_among(db: AsyncSession, user_id: int, candidate_ids: List[int]) -> set:
+    """The subset of candidate_ids that user_id follows"""
+    rows = await db.execute(select(followers.c.followed_id).where(
+        followers.c.follower_id == user_id, followers.c.followed_id.in_(candidate_ids)
+    ))
+    return {row.followed_id for row in rows}
+
+async def _follow_counts(db: AsyncSession, user_ids: List[int]) -> Dict[int, Tuple[int, int]]:
+    """(followers, following) per user from one grouped query"""
+    incoming = select(followers.c.followed_id.label("user_id"), literal(0).label("outgoing"))\
+        .where(followers.c.followed_id.in_(user_ids))
+    outgoing = select(followers.c.follower_id.label("user_id"), literal(1).label("outgoing"))\
+        .where(followers.c.follower_id.in_(user_ids))
+    edges = union_all(incoming, outgoing).subquery()
+
+    rows = await db.execute(
+        select(edges.c.user_id, edges.c.outgoing, func.count()).group_by(edges.c.user_id, edges.c.outgoing)
+    )
+    counts = {}
+    for user_id, is_outgoing, count in rows:
+        followers_count, following_count = counts.get(user_id, (0, 0))
+        counts[user_id] = (followers_count, count) if is_outgoing else (count, following_count)
+    return counts
+
+def _prefix_match(column, prefix: str):
+    """Case-insensitive prefix filter written as a range so the lower() index can serve it"""
+    lowered = func.lower(column)
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(lowered >= prefix, lowered < upper)
+
+def _profiles(users: Iterable[User], counts: Dict[int, Tuple[int, int]], following_ids: set) -> List[dict]:
+    response = []
+    for user in users:
+        followers_count, following_count = counts.get(user.id, (0, 0))
+        response.append({
+            "id": user.id,
+            "username": user.username,
+            "display_name": user.display_name,
+            "theme": user.theme,
+            "avatar_url": user.avatar_url,
+            "is_following": user.id in following_ids,
+            "followers_count": followers_count,
+            "following_count": following_count
+        })
+    return response
+
 class UserProfile(BaseModel):
     id: int
     username: str
@@ -22,92 +78,184 @@ class UserProfile(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkFollow(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=500)
+
 class UpdateProfile(BaseModel):
     display_name: str | None = None
     theme: ThemeType | None = None
     avatar_url: str | None = None
 
-@router.get("/", response_model=List[UserProfile])
+async def _user_page(
+    db: AsyncSession, viewer_id: int, response: Response, limit: int, cursor: Optional[str], prefix: str = ""
+) -> List[dict]:
+    """A page of users in id order (X-Next-Cursor when there may be more), counts for the page only"""
+    query = select(User).order_by(User.id).limit(limit)
+    if prefix:
+        query = query.where(or_(_prefix_match(User.username, prefix), _prefix_match(User.display_name, prefix)))
+    if cursor:
+        query = query.where(User.id > decode_id_cursor(cursor))
+    users = (await db.scalars(query)).all()
+
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = encode_id_cursor(users[-1].id)
+    if not users:
+        return []
+
+    page_ids = [user.id for user in users]
+    counts = await _follow_counts(db, page_ids)
+    following_ids = await _following_among(db, viewer_id, page_ids)
+    return _profiles(users, counts, following_ids)
+
+@router.get("/", response_model=List[UserProfile], dependencies=[Depends(query_budget(6))])
 async def get_all_users(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    users = db.query(User).all()
-    response = []
-
-    for user in users:
-        is_following = user in current_user.following
-        response.append({
-            "id": user.id,
-            "username": user.username,
-            "display_name": user.display_name,
-            "theme": user.theme,
-            "avatar_url": user.avatar_url,
-            "is_following": is_following,
-            "followers_count": len(user.followers),
-            "following_count": len(user.following)
-        })
+    """Users in id order, a page at a time"""
+    return await _user_page(db, current_user.id, response, limit, cursor)
 
-    return response
+@router.get("/directory", response_model=List[UserProfile], dependencies=[Depends(query_budget(6))])
+async def get_directory(
+    response: Response,
+    q: Optional[str] = Query(None, max_length=50),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Users in id order, optionally filtered by a username/display name prefix"""
+    return await _user_page(db, current_user.id, response, limit, cursor, prefix=(q or "").strip().lower())
 
-@router.get("/{user_id}", response_model=UserProfile)
+@router.get("/{user_id}", response_model=UserProfile, dependencies=[Depends(query_budget(4))])
 async def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    # The whole profile is one small row, so it doubles as its own version
+    profile = (await db.execute(
+        select(
+            User.id, User.username, User.display_name, User.theme, User.avatar_url,
+            exists().where(
+                followers.c.follower_id == current_user.id, followers.c.followed_id == User.id
+            ).label("is_following"),
+            select(func.count()).where(followers.c.followed_id == User.id)
+            .scalar_subquery().label("followers_count"),
+            select(func.count()).where(followers.c.follower_id == User.id)
+            .scalar_subquery().label("following_count"),
+        ).where(User.id == user_id)
+    )).first()
+    if not profile:
         raise HTTPException(status_code=404, detail="User not found")
 
-    is_following = user in current_user.following
+    etag = make_etag(current_user.id, tuple(profile))
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return {
-        "id": user.id,
-        "username": user.username,
-        "display_name": user.display_name,
-        "theme": user.theme,
-        "avatar_url": user.avatar_url,
-        "is_following": is_following,
-        "followers_count": len(user.followers),
-        "following_count": len(user.following)
-    }
+    cache_headers(response, etag)
+    return dict(profile._mapping)
 
 @router.put("/me", response_model=dict)
 async def update_profile(
     profile_data: UpdateProfile,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
+    user = await db.get(User, current_user.id)
     if profile_data.display_name:
-        current_user.display_name = profile_data.display_name
+        user.display_name = profile_data.display_name
     if profile_data.theme:
-        current_user.theme = profile_data.theme
+        user.theme = profile_data.theme
     if profile_data.avatar_url is not None:
-        current_user.avatar_url = profile_data.avatar_url
+        user.avatar_url = profile_data.avatar_url
 
-    db.commit()
+    await db.commit()
+    invalidate_principal(user.username)
     return {"message": "Profile updated successfully"}
 
-@router.post("/{user_id}/follow", response_model=dict)
+@router.post("/follow/bulk", response_model=dict)
+async def bulk_follow(
+    request: BulkFollow,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Follow many users in one statement; already-followed and unknown ids are skipped"""
+    target_ids = set(await db.scalars(
+        select(User.id).where(User.id.in_(set(request.user_ids) - {current_user.id}))
+    ))
+    added = []
+    if target_ids:
+        added = list(await db.scalars(
+            upsert_insert(db, followers)
+            .values([{"follower_id": current_user.id, "followed_id": user_id} for user_id in target_ids])
+            .on_conflict_do_nothing()
+            .returning(followers.c.followed_id)
+        ))
+        if settings.TIMELINE_FANOUT and added:
+            await backfill_follow(db, current_user.id, added)
+        await db.commit()
+        event_broker.add_topics(current_user.id, [author_topic(user_id) for user_id in added])
+
+    return {"message": f"Now following {len(added)} users", "user_ids": sorted(added)}
+
+@router.post("/unfollow/bulk", response_model=dict)
+async def bulk_unfollow(
+    request: BulkFollow,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Unfollow many users in one statement; ids that were not followed are skipped"""
+    removed = list(await db.scalars(
+        delete(followers)
+        .where(followers.c.follower_id == current_user.id, followers.c.followed_id.in_(set(request.user_ids)))
+        .returning(followers.c.followed_id)
+    ))
+    if settings.TIMELINE_FANOUT and removed:
+        await prune_unfollow(db, current_user.id, removed)
+    await db.commit()
+    event_broker.remove_topics(current_user.id, [author_topic(user_id) for user_id in removed])
+
+    return {"message": f"Unfollowed {len(removed)} users", "user_ids": sorted(removed)}
+
+@router.post("/{user_id}/follow", response_model=dict, dependencies=[Depends(query_budget(9))])
 async def toggle_follow(
     user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
 
-    target_user = db.query(User).filter(User.id == user_id).first()
+    target_user = await db.get(User, user_id)
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if target_user in current_user.following:
-        current_user.following.remove(target_user)
+    edge = (followers.c.follower_id == current_user.id) & (followers.c.followed_id == user_id)
+    if await db.scalar(select(followers.c.followed_id).where(edge)) is not None:
+        await db.execute(delete(followers).where(edge))
+        if settings.TIMELINE_FANOUT:
+            await prune_unfollow(db, current_user.id, [user_id])
         message = f"Unfollowed {target_user.display_name}"
+        update_topics = event_broker.remove_topics
     else:
-        current_user.following.append(target_user)
+        # ON CONFLICT: a concurrent tap may have followed since the check; that one backfills
+        followed = await db.scalar(
+            upsert_insert(db, followers)
+            .values(follower_id=current_user.id, followed_id=user_id)
+            .on_conflict_do_nothing()
+            .returning(followers.c.followed_id)
+        )
+        if settings.TIMELINE_FANOUT and followed is not None:
+            await backfill_follow(db, current_user.id, [user_id])
         message = f"Now following {target_user.display_name}"
+        update_topics = event_broker.add_topics
 
-    db.commit()
-    return {"message": message}
\ No newline at end of file
+    await db.commit()
+    update_topics(current_user.id, [author_topic(user_id)])
+    return {"message": message}
@@ -1,24 +1,87 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.database import get_db
-from app.models import User
+from app.models import User, ThemeType
+from app.utils.cache import TTLCache
+from app.utils.rate_limit import TokenBucketLimiter
+from app.utils.workers import run_password_hash
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+@dataclass(frozen=True)
+class Principal:
+    """Snapshot of the authenticated user, detached from any database session"""
+    id: int
+    username: str
+    display_name: str
+    theme: ThemeType
+    avatar_url: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            display_name=user.display_name,
+            theme=user.theme,
+            avatar_url=user.avatar_url
+        )
+
+# The principal of the request being handled, set by get_current_user (for hooks outside the route)
+current_principal: ContextVar[Optional[Principal]] = ContextVar("current_principal", default=None)
+
+# Principals by username, so that authenticated requests skip the users lookup
+principal_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_principal(username: str):
+    """Drop a cached principal; call whenever a user's profile changes or the user is deleted"""
+    principal_cache.invalidate(username)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return pwd_context.hash("not a real password")
+
+def _verify_and_update(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    if hashed_password is None:
+        # Unknown user: spend the same time as a real check so response timing reveals nothing
+        pwd_context.verify(plain_password, _dummy_hash())
+        return False, None
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def check_password(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Verify off the event loop; also returns a new hash when the stored one uses an outdated cost"""
+    return await run_password_hash(_verify_and_update, plain_password, hashed_password)
+
+async def hash_password(password: str) -> str:
+    """get_password_hash off the event loop"""
+    return await run_password_hash(get_password_hash, password)
+
+# Failed logins, counted per username and per client address
+username_login_limiter = TokenBucketLimiter(
+    capacity=settings.LOGIN_FAILURE_BURST, refill_seconds=settings.LOGIN_FAILURE_REFILL_SECONDS
+)
+ip_login_limiter = TokenBucketLimiter(
+    capacity=settings.LOGIN_IP_FAILURE_BURST, refill_seconds=settings.LOGIN_FAILURE_REFILL_SECONDS
+)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -29,21 +92,76 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def token_claims(token: str) -> Optional[dict]:
+    """The claims of a valid, unexpired token (access token or stream ticket), otherwise None"""
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+
+def token_username(token: str) -> Optional[str]:
+    """The username a valid access token was issued to, without a database lookup"""
+    claims = token_claims(token)
+    if claims is None or "scope" in claims:  # Stream tickets authenticate nothing else
+        return None
+    return claims.get("sub")
+
+# EventSource cannot send headers, so a stream's credentials go in its URL, and with it into
+# access logs. A ticket is what goes there instead of the access token: it expires within
+# EVENTS_TICKET_SECONDS and can only open a stream, which closes when the access token expires.
+STREAM_TICKET_SCOPE = "events"
+
+def create_stream_ticket(access_claims: dict) -> str:
+    return jwt.encode({
+        "sub": access_claims["sub"],
+        "scope": STREAM_TICKET_SCOPE,
+        "exp": datetime.utcnow() + timedelta(seconds=settings.EVENTS_TICKET_SECONDS),
+        "access_exp": access_claims["exp"],
+    }, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def stream_ticket_claims(ticket: str) -> Optional[dict]:
+    claims = token_claims(ticket)
+    if claims is None or claims.get("scope") != STREAM_TICKET_SCOPE:
+        return None
+    return claims
+
+def is_admin(username: Optional[str]) -> bool:
+    return username is not None and username in settings.ADMIN_USERNAMES
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+async def resolve_principal(token: str, db: AsyncSession) -> Principal:
+    """The principal for a bearer token, raising 401 if it is invalid or the user is gone"""
+    username = token_username(token)
+    if username is None:
+        raise credentials_exception()
+    return await load_principal(username, db)
+
+async def load_principal(username: str, db: AsyncSession) -> Principal:
+    """The principal for an already authenticated username, raising 401 if the user is gone"""
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    user = await db.scalar(select(User).where(User.username == username))
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise credentials_exception()
+
+    principal = Principal.from_user(user)
+    principal_cache.set(username, principal)
+    return principal
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
+    principal = await resolve_principal(token, db)
+    current_principal.set(principal)
+    return principal
+
+async def get_admin_user(current_user: Principal = Depends(get_current_user)) -> Principal:
+    if not is_admin(current_user.username):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only")
+    return current_user
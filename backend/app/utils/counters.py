@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Post, Comment, Reaction, PostReactionCount
+from app.utils.sql import upsert_insert
+
+async def adjust_comments_count(db: AsyncSession, post_id: int, delta: int):
+    # Post.updated_at's onupdate also moves the post's ETag version
+    await db.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(comments_count=Post.comments_count + delta)
+    )
+
+async def touch_post(db: AsyncSession, post_id: int):
+    """Bump Post.updated_at after a change that does not write the posts row (e.g. reactions)"""
+    await db.execute(update(Post).where(Post.id == post_id).values(updated_at=datetime.utcnow()))
+
+async def adjust_reaction_count(db: AsyncSession, post_id: int, emoji: str, delta: int,
+                                reaction_id: Optional[int] = None):
+    """Add delta to a post's total for one emoji, creating the counter row on first use.
+
+    reaction_id is the reaction being added. An emoji that had none takes it as its first
+    reaction and moves to the end of the summary; one that still has reactions keeps its place.
+    """
+    stmt = upsert_insert(db, PostReactionCount).values(
+        post_id=post_id, emoji=emoji, count=max(delta, 0), first_reaction_id=reaction_id
+    )
+    set_ = {"count": PostReactionCount.count + delta}
+    if reaction_id is not None:
+        set_["first_reaction_id"] = case(
+            (PostReactionCount.count <= 0, reaction_id), else_=PostReactionCount.first_reaction_id
+        )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[PostReactionCount.post_id, PostReactionCount.emoji],
+        set_=set_,
+    ))
+
+def reconcile_counters(db: Session, apply: bool = True) -> List[Tuple[int, str, int, int]]:
+    """Recompute counters from comments and reactions, returning (post_id, counter, stored, actual) drift"""
+    drift = []
+
+    actual_comments: Dict[int, int] = dict(
+        db.execute(select(Comment.post_id, func.count()).group_by(Comment.post_id)).all()
+    )
+    for post_id, stored in db.execute(select(Post.id, Post.comments_count)).all():
+        actual = actual_comments.get(post_id, 0)
+        if stored != actual:
+            drift.append((post_id, "comments", stored, actual))
+
+    actual_reactions: Dict[Tuple[int, str], int] = {
+        (post_id, emoji): count for post_id, emoji, count in db.execute(
+            select(Reaction.post_id, Reaction.emoji, func.count()).group_by(Reaction.post_id, Reaction.emoji)
+        ).all()
+    }
+    stored_reactions: Dict[Tuple[int, str], int] = {
+        (post_id, emoji): count for post_id, emoji, count in db.execute(
+            select(PostReactionCount.post_id, PostReactionCount.emoji, PostReactionCount.count)
+        ).all()
+    }
+    for key in sorted(actual_reactions.keys() | stored_reactions.keys()):
+        stored = stored_reactions.get(key, 0)
+        actual = actual_reactions.get(key, 0)
+        if stored != actual:
+            drift.append((key[0], f"reaction {key[1]}", stored, actual))
+
+    if apply:
+        comment_totals = select(func.count()).where(Comment.post_id == Post.id).scalar_subquery()
+        db.execute(update(Post).values(comments_count=comment_totals))
+        db.execute(delete(PostReactionCount))
+        db.execute(PostReactionCount.__table__.insert().from_select(
+            ["post_id", "emoji", "count", "first_reaction_id"],
+            select(Reaction.post_id, Reaction.emoji, func.count(), func.min(Reaction.id))
+            .group_by(Reaction.post_id, Reaction.emoji)
+        ))
+
+    return drift
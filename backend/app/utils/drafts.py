@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from weakref import WeakValueDictionary
+
+from sqlalchemy import delete, func, select
+
+from app.config import settings
+from app.database import new_session
+from app.models import DrawingDraft, DrawingDraftDelta
+
+logger = logging.getLogger(__name__)
+
+class DraftSequenceError(Exception):
+    """A delta arrived after a gap in sequence numbers; the client must resend its full canvas"""
+
+    def __init__(self, expected_seq: int):
+        super().__init__(f"Expected seq {expected_seq}")
+        self.expected_seq = expected_seq
+
+@dataclass
+class PendingDraft:
+    seq: int
+    strokes: List[dict] = field(default_factory=list)
+    base: Optional[dict] = None  # Set when the client replaced the whole canvas
+    since: float = field(default_factory=time.monotonic)
+
+class DraftStore:
+    """Per-user drawing drafts: append-only stroke deltas, coalesced in memory and written behind.
+
+    Deltas that arrive within DRAFT_FLUSH_INTERVAL_SECONDS of each other become a single
+    drawing_draft_deltas row, and once a draft has DRAFT_COMPACT_AFTER rows they are folded
+    into its base. State is per process, so this assumes a single app worker. A user's
+    sequence state is dropped once their buffer is written and reloaded on their next save,
+    so memory follows the users drawing now rather than everyone who ever saved.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, PendingDraft] = {}
+        self._last_seq: Dict[int, int] = {}
+        self._delta_rows: Dict[int, int] = {}
+        # Weak, so a user's lock lives only while some request holds or waits for it
+        self._locks: "WeakValueDictionary[int, asyncio.Lock]" = WeakValueDictionary()
+
+    def _lock(self, user_id: int) -> asyncio.Lock:
+        return self._locks.setdefault(user_id, asyncio.Lock())
+
+    async def _load_last_seq(self, user_id: int) -> int:
+        if user_id not in self._last_seq:
+            async with new_session() as db:
+                delta_seq = await db.scalar(
+                    select(func.max(DrawingDraftDelta.seq)).where(DrawingDraftDelta.user_id == user_id)
+                )
+                base_seq = await db.scalar(select(DrawingDraft.base_seq).where(DrawingDraft.user_id == user_id))
+                self._delta_rows[user_id] = await db.scalar(
+                    select(func.count()).select_from(DrawingDraftDelta).where(DrawingDraftDelta.user_id == user_id)
+                )
+            self._last_seq[user_id] = max(delta_seq or 0, base_seq or 0)
+        return self._last_seq[user_id]
+
+    async def append(self, user_id: int, seq: int, strokes: List[dict], base: Optional[dict] = None) -> int:
+        """Buffer a delta (or a full replacement when base is given) and return the latest seq"""
+        async with self._lock(user_id):
+            last_seq = await self._load_last_seq(user_id)
+            # A base is the whole canvas, so it is applied whatever its seq: a client that
+            # restarted its counter (a new tab, a reload, a discard from another session)
+            # renumbers from there instead of having its canvas dropped as a retry
+            if base is None:
+                if seq <= last_seq:
+                    # A retry of something already stored
+                    return last_seq
+                if seq != last_seq + 1:
+                    raise DraftSequenceError(last_seq + 1)
+
+            pending = self._pending.get(user_id)
+            if base is not None or pending is None:
+                pending = self._pending[user_id] = PendingDraft(seq=seq, base=base)
+            pending.seq = seq
+            pending.strokes.extend(strokes)
+            self._last_seq[user_id] = seq
+
+            if len(pending.strokes) >= settings.DRAFT_MAX_PENDING_STROKES:
+                await self._flush_locked(user_id)
+            return seq
+
+    async def _flush_locked(self, user_id: int):
+        pending = self._pending.pop(user_id, None)
+        if pending is None:
+            return
+
+        try:
+            await self._write_pending(user_id, pending)
+        except Exception:
+            # Keep the strokes buffered so the next flush retries them
+            self._pending[user_id] = pending
+            raise
+
+        if self._delta_rows.get(user_id, 0) >= settings.DRAFT_COMPACT_AFTER:
+            await self._compact_locked(user_id)
+
+    async def _write_pending(self, user_id: int, pending: PendingDraft):
+        async with new_session() as db:
+            if pending.base is not None:
+                await db.execute(delete(DrawingDraftDelta).where(DrawingDraftDelta.user_id == user_id))
+                await db.execute(delete(DrawingDraft).where(DrawingDraft.user_id == user_id))
+                base = dict(pending.base)
+                base["lines"] = list(base.get("lines", [])) + pending.strokes
+                db.add(DrawingDraft(user_id=user_id, base_data=json.dumps(base), base_seq=pending.seq))
+                self._delta_rows[user_id] = 0
+            elif pending.strokes:
+                db.add(DrawingDraftDelta(user_id=user_id, seq=pending.seq, strokes=json.dumps(pending.strokes)))
+                self._delta_rows[user_id] = self._delta_rows.get(user_id, 0) + 1
+            await db.commit()
+
+    async def _compact_locked(self, user_id: int):
+        """Fold a user's deltas into the draft base"""
+        async with new_session() as db:
+            draft = await db.get(DrawingDraft, user_id)
+            deltas = (await db.scalars(
+                select(DrawingDraftDelta).where(DrawingDraftDelta.user_id == user_id).order_by(DrawingDraftDelta.seq)
+            )).all()
+            if not deltas:
+                return
+
+            base = json.loads(draft.base_data) if draft and draft.base_data else {"lines": []}
+            for delta in deltas:
+                base.setdefault("lines", []).extend(json.loads(delta.strokes))
+
+            if draft is None:
+                draft = DrawingDraft(user_id=user_id)
+                db.add(draft)
+            draft.base_data = json.dumps(base)
+            draft.base_seq = deltas[-1].seq
+            await db.execute(delete(DrawingDraftDelta).where(
+                DrawingDraftDelta.user_id == user_id, DrawingDraftDelta.seq <= draft.base_seq
+            ))
+            await db.commit()
+        self._delta_rows[user_id] = 0
+
+    async def flush(self, user_id: int):
+        async with self._lock(user_id):
+            await self._flush_locked(user_id)
+
+    async def flush_due(self, force: bool = False):
+        """Write out every buffer older than the flush interval (or all of them when forced)"""
+        cutoff = time.monotonic() - settings.DRAFT_FLUSH_INTERVAL_SECONDS
+        for user_id, pending in list(self._pending.items()):
+            if force or pending.since <= cutoff:
+                try:
+                    await self.flush(user_id)
+                except Exception:
+                    logger.exception("Failed to flush drawing draft for user %s", user_id)
+        self._evict_idle()
+
+    def _evict_idle(self):
+        """Forget the sequence state of users with nothing buffered and no request in progress"""
+        for user_id in list(self._last_seq):
+            lock = self._locks.get(user_id)
+            if user_id not in self._pending and (lock is None or not lock.locked()):
+                del self._last_seq[user_id]
+                self._delta_rows.pop(user_id, None)
+
+    async def run_flusher(self):
+        while True:
+            await asyncio.sleep(settings.DRAFT_FLUSH_INTERVAL_SECONDS / 2)
+            await self.flush_due()
+
+    async def resume(self, user_id: int) -> dict:
+        """The merged draft (base plus every delta) and its latest seq"""
+        async with self._lock(user_id):
+            await self._flush_locked(user_id)
+            async with new_session() as db:
+                draft = await db.get(DrawingDraft, user_id)
+                deltas = (await db.scalars(
+                    select(DrawingDraftDelta).where(DrawingDraftDelta.user_id == user_id).order_by(DrawingDraftDelta.seq)
+                )).all()
+
+        if draft is None and not deltas:
+            return {"seq": 0, "drawing_data": None}
+
+        merged = json.loads(draft.base_data) if draft and draft.base_data else {"lines": []}
+        for delta in deltas:
+            merged.setdefault("lines", []).extend(json.loads(delta.strokes))
+        seq = deltas[-1].seq if deltas else draft.base_seq
+        return {"seq": seq, "drawing_data": json.dumps(merged)}
+
+    async def discard(self, user_id: int):
+        async with self._lock(user_id):
+            self._pending.pop(user_id, None)
+            async with new_session() as db:
+                await db.execute(delete(DrawingDraftDelta).where(DrawingDraftDelta.user_id == user_id))
+                await db.execute(delete(DrawingDraft).where(DrawingDraft.user_id == user_id))
+                await db.commit()
+            self._last_seq[user_id] = 0
+            self._delta_rows[user_id] = 0
+
+draft_store = DraftStore()
@@ -0,0 +1,131 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Optional, Set
+
+from app.config import settings
+
+# Sent in place of dropped events when a connection falls behind; clients re-fetch the feed once
+RESYNC = {"type": "resync"}
+
+def author_topic(author_id: int) -> str:
+    """Topic carrying events about an author's posts (new posts, comments, reactions)"""
+    return f"author:{author_id}"
+
+class Subscription:
+    """One connected client: a bounded queue of pending events and the topics it listens to"""
+
+    def __init__(self, user_id: int, topics: Iterable[str], max_pending: int):
+        self.user_id = user_id
+        self.topics: Set[str] = set(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        """Queue an event without ever blocking the publisher"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow reader loses its backlog rather than holding up everyone else
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def next_event(self, timeout: float) -> Optional[dict]:
+        """The next event, or None if nothing arrived within timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class Broker(ABC):
+    """Routes events published on topics to subscribed connections.
+
+    Only this process's connections are reached by InProcessBroker; a multi-worker deployment
+    needs an implementation backed by a shared channel (e.g. Redis or Postgres LISTEN/NOTIFY).
+    """
+
+    @abstractmethod
+    def subscribe(self, user_id: int, topics: Iterable[str]) -> Subscription:
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription):
+        ...
+
+    @abstractmethod
+    async def publish(self, topic: str, event: dict):
+        ...
+
+    @abstractmethod
+    def add_topics(self, user_id: int, topics: Iterable[str]):
+        """Extend every connection of a user (e.g. after a follow)"""
+
+    @abstractmethod
+    def remove_topics(self, user_id: int, topics: Iterable[str]):
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+class InProcessBroker(Broker):
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._by_topic: Dict[str, Set[Subscription]] = {}
+        self._by_user: Dict[int, Set[Subscription]] = {}
+        self.published = 0
+
+    def subscribe(self, user_id: int, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(user_id, topics, self.max_pending)
+        self._by_user.setdefault(user_id, set()).add(subscription)
+        for topic in subscription.topics:
+            self._by_topic.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._discard(self._by_user, subscription.user_id, subscription)
+        for topic in subscription.topics:
+            self._discard(self._by_topic, topic, subscription)
+
+    async def publish(self, topic: str, event: dict):
+        self.published += 1
+        for subscription in list(self._by_topic.get(topic, ())):
+            subscription.offer(event)
+
+    def add_topics(self, user_id: int, topics: Iterable[str]):
+        topics = set(topics)
+        for subscription in self._by_user.get(user_id, ()):
+            subscription.topics |= topics
+            for topic in topics:
+                self._by_topic.setdefault(topic, set()).add(subscription)
+
+    def remove_topics(self, user_id: int, topics: Iterable[str]):
+        topics = set(topics)
+        for subscription in self._by_user.get(user_id, ()):
+            subscription.topics -= topics
+            for topic in topics:
+                self._discard(self._by_topic, topic, subscription)
+
+    def stats(self) -> dict:
+        connections = [s for subs in self._by_user.values() for s in subs]
+        return {
+            "connections": len(connections),
+            "topics": len(self._by_topic),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in connections),
+        }
+
+    @staticmethod
+    def _discard(index: dict, key, subscription: Subscription):
+        subscribers = index.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del index[key]
+
+def get_broker() -> Broker:
+    if settings.EVENTS_BROKER == "memory":
+        return InProcessBroker(settings.EVENTS_MAX_PENDING)
+    raise ValueError(f"Unknown EVENTS_BROKER {settings.EVENTS_BROKER!r}")
+
+event_broker = get_broker()
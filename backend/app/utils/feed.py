@@ -0,0 +1,80 @@
+from typing import Dict, List
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only
+
+from app.models import Post, Reaction, PostReactionCount, User
+from app.models.user import followers
+
+def visible_authors_filter(user_id: int):
+    """Filter matching posts by the user and by everyone they follow"""
+    followed_ids = select(followers.c.followed_id).where(followers.c.follower_id == user_id)
+    return or_(Post.author_id == user_id, Post.author_id.in_(followed_ids))
+
+def feed_query(version_only: bool = False):
+    """Post select for list-style reads, with the author joined in.
+
+    version_only loads just what page_version needs, for answering conditional requests.
+    """
+    if version_only:
+        return select(Post).options(
+            load_only(Post.id, Post.author_id, Post.created_at, Post.updated_at),
+            joinedload(Post.author).load_only(User.display_name, User.avatar_url)
+        )
+    return select(Post).options(joinedload(Post.author))
+
+def page_version(posts: List[Post]) -> list:
+    """Everything a page of PostResponses depends on that can change.
+
+    Comment and reaction writes bump Post.updated_at, which covers the counters and the
+    viewer's own reaction; author names and avatars are read from the joined author.
+    """
+    return [
+        (post.id, post.updated_at, post.author.display_name, post.author.avatar_url)
+        for post in posts
+    ]
+
+async def hydrate_posts(db: AsyncSession, posts: List[Post], viewer_id: int) -> List[dict]:
+    """Build PostResponse dicts for a page of posts with a fixed number of queries"""
+    if not posts:
+        return []
+
+    post_ids = [post.id for post in posts]
+
+    reactions_summary: Dict[int, List[dict]] = {}
+    count_rows = await db.execute(
+        select(PostReactionCount.post_id, PostReactionCount.emoji, PostReactionCount.count)
+        .where(PostReactionCount.post_id.in_(post_ids), PostReactionCount.count > 0)
+        # In the order the emojis first appeared on the post, as the summary has always been listed;
+        # NULLs (no first reaction known) last on every backend, since SQLite and Postgres disagree
+        .order_by(PostReactionCount.first_reaction_id.nulls_last(), PostReactionCount.emoji)
+    )
+    for post_id, emoji, count in count_rows:
+        reactions_summary.setdefault(post_id, []).append({"emoji": emoji, "count": count})
+
+    user_reaction_rows = await db.execute(
+        select(Reaction.post_id, Reaction.emoji)
+        .where(Reaction.post_id.in_(post_ids), Reaction.user_id == viewer_id)
+    )
+    user_reactions: Dict[int, str] = dict(user_reaction_rows.all())
+
+    return [
+        {
+            "id": post.id,
+            "author_id": post.author_id,
+            "author_name": post.author.display_name,
+            "author_avatar": post.author.avatar_url,
+            "post_type": post.post_type,
+            "content": post.content,
+            "media_url": post.media_url,
+            "created_at": post.created_at,
+            "comments_count": post.comments_count,
+            "reactions": reactions_summary.get(post.id, []),
+            "user_reaction": user_reactions.get(post.id)
+        } for post in posts
+    ]
+
+async def hydrate_post(db: AsyncSession, post: Post, viewer_id: int) -> dict:
+    """Single-post variant of hydrate_posts"""
+    return (await hydrate_posts(db, [post], viewer_id))[0]
@@ -0,0 +1,38 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+
+from app.utils.serialization import negotiated_media_type
+
+# Clients may keep responses but must revalidate them (If-None-Match) before every reuse
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """Weak ETag over a response's version inputs (weak, since bodies may be compressed).
+
+    The negotiated media type is one of the inputs, so the JSON and msgpack representations
+    of the same data never validate each other.
+    """
+    raw = json.dumps([negotiated_media_type(), *parts], default=str, separators=(",", ":"))
+    return f'W/"{hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names etag (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+def cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    cache_headers(response, etag)
+    return response
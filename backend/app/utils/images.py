@@ -0,0 +1,47 @@
+import struct
+from io import BytesIO
+from typing import Optional, Tuple
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_TRAILER = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+# Extension for each accepted upload format, by its leading bytes
+IMAGE_SIGNATURES = (
+    (PNG_SIGNATURE, ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+def sniff_image_extension(head: bytes) -> Optional[str]:
+    """The extension for an image's first bytes (PNG, JPEG, GIF or WebP), otherwise None"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+def png_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height of a complete PNG (signature, IHDR and IEND present), otherwise None"""
+    if len(data) < 45 or not data.startswith(PNG_SIGNATURE) or not data.endswith(PNG_TRAILER):
+        return None
+    length, chunk_type = struct.unpack(">I4s", data[8:16])
+    if chunk_type != b"IHDR" or length != 13:
+        return None
+    width, height = struct.unpack(">II", data[16:24])
+    if width == 0 or height == 0:
+        return None
+    return width, height
+
+def reencode_png(data: bytes, max_dimension: int) -> bytes:
+    """Decode any image Pillow understands and re-encode it as PNG (runs in a worker process)"""
+    from PIL import Image
+
+    image = Image.open(BytesIO(data))
+    if max(image.size) > max_dimension:
+        raise ValueError(f"Image is larger than {max_dimension}px")
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+from sqlalchemy import event
+
+from app.utils.queries import route_label
+
+# Prometheus metrics for this process. With several workers, scrape each one or set
+# PROMETHEUS_MULTIPROC_DIR (see prometheus_client's multiprocess mode).
+
+disable_created_metrics()  # Drop the *_created series, which nothing here graphs
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+http_requests = Counter(
+    "http_requests", "HTTP requests by route template and status", ["method", "route", "status"]
+)
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "Time until the last response byte, per route (event streams excluded)",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+http_request_statements = Histogram(
+    "http_request_sql_statements", "SQL statements executed per request; a rising count signals N+1 queries",
+    ["method", "route"], buckets=STATEMENT_BUCKETS
+)
+http_request_sql_seconds = Histogram(
+    "http_request_sql_duration_seconds", "Time spent executing SQL per request",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+sql_statements = Counter("sql_statements", "SQL statements executed, in requests or not", ["engine"])
+pool_checked_out = Gauge("db_pool_checked_out", "Connections currently checked out of the pool", ["engine"])
+pool_checkouts = Counter("db_pool_checkouts", "Connection checkouts from the pool", ["engine"])
+pool_connects = Counter("db_pool_connects", "New database connections opened", ["engine"])
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer it was asked to run on time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+def instrument_engine(engine, name: str):
+    """Count statements and pool use; engine is a sync Engine (or an AsyncEngine's sync_engine).
+    Per-request SQL time comes from app.utils.queries, which times every statement already."""
+    statements = sql_statements.labels(name)
+    checked_out = pool_checked_out.labels(name)
+    checkouts = pool_checkouts.labels(name)
+    connects = pool_connects.labels(name)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.inc()
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        connects.inc()
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.inc()
+        checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+class MetricsMiddleware:
+    """Per-route request count, latency, SQL statement count and SQL time (the SQL figures need
+    QueryTrackingMiddleware inside this one)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def recording_send(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                streaming = content_type.startswith(b"text/event-stream")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            method, route = scope["method"], route_label(scope)
+            http_requests.labels(method, route, str(status)).inc()
+            if not streaming:
+                # A stream's duration is how long the client stayed connected, not a latency
+                http_request_seconds.labels(method, route).observe(time.perf_counter() - started)
+            queries = scope.get("queries")
+            if queries is not None:
+                http_request_statements.labels(method, route).observe(queries.statements)
+                http_request_sql_seconds.labels(method, route).observe(queries.sql_seconds)
+
+async def sample_event_loop_lag(interval: float):
+    """Run for the life of the app, timing how late each sleep(interval) wakes up"""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, loop.time() - scheduled))
+
+def render_metrics() -> tuple:
+    """(body, content type) in the Prometheus text exposition format"""
+    return generate_latest(), CONTENT_TYPE_LATEST
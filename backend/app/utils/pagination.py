@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+def _pack(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _unpack(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque URL-safe token"""
+    return _pack([created_at.isoformat(), row_id])
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a token produced by encode_cursor, rejecting anything malformed"""
+    try:
+        created_at, row_id = _unpack(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise _invalid_cursor()
+
+def encode_id_cursor(row_id: int) -> str:
+    """Encode an id-only keyset position (for lists ordered by primary key)"""
+    return _pack([row_id])
+
+def decode_id_cursor(cursor: str) -> int:
+    """Decode a token produced by encode_id_cursor, rejecting anything malformed"""
+    try:
+        row_id, = _unpack(cursor)
+        return int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise _invalid_cursor()
+
+def keyset_before(created_col, id_col, cursor: str):
+    """Filter for rows strictly after the cursor in (created_at DESC, id DESC) order"""
+    created_at, row_id = decode_cursor(cursor)
+    return tuple_(created_col, id_col) < tuple_(created_at, row_id)
+
+def next_cursor(rows: list, limit: int) -> Optional[str]:
+    """Cursor for the page following rows, or None when this was the last page"""
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1].created_at, rows[-1].id)
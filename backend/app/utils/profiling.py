@@ -0,0 +1,179 @@
+import asyncio
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import parse_qsl
+
+from app.config import settings
+from app.utils.auth import is_admin, token_username
+from app.utils.queries import route_label
+
+# Wall-clock profiles of single requests, written in the collapsed-stack format that
+# flamegraph.pl, speedscope and most flame-graph viewers read: one "frame;frame;frame weight"
+# line per distinct stack, weighted in microseconds.
+
+PROFILE_NAME = re.compile(
+    r"^(?P<created>\d{8}T\d{12})-(?P<id>[0-9a-f]{8})-(?P<method>[A-Z]+)-(?P<route>.+)-(?P<ms>\d+)ms\.collapsed$"
+)
+
+def _label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}"
+
+class RequestSampler:
+    """Samples one request's coroutine from a background thread.
+
+    While the request's code runs, a sample is the event loop's stack from that coroutine down
+    (Pydantic validation, template rendering...). While it is suspended, a sample is its chain
+    of awaits, ending in "(waiting)": time in the database, bcrypt's thread pool or the image
+    process pool shows up under the call that awaited it. Other requests' time never does.
+    """
+
+    def __init__(self, coro, interval: float):
+        self.coro = coro
+        self.interval = interval
+        self.samples = Counter()
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            stack = self._sample()
+            now = time.perf_counter()
+            # Weighted by the time since the last sample, since the GIL can delay a tick
+            if stack:
+                self.samples[stack] += round((now - last) * 1_000_000)
+            last = now
+
+    def _sample(self) -> Optional[tuple]:
+        root = self.coro.cr_frame
+        if root is None:  # Finished
+            return None
+
+        if self.coro.cr_running:
+            stack = []
+            frame = sys._current_frames().get(self._loop_thread)
+            while frame is not None:
+                stack.append(_label(frame))
+                if frame is root:
+                    return tuple(reversed(stack))
+                frame = frame.f_back
+            return None  # The loop switched tasks mid-walk
+
+        stack = []
+        awaitable = self.coro
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                break
+            stack.append(_label(frame))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        stack.append("(waiting)")
+        return tuple(stack)
+
+def write_profile(name: str, samples: Counter):
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    lines = [f"{';'.join(stack)} {weight}\n" for stack, weight in samples.most_common()]
+    partial = directory / f".{name}.tmp"
+    partial.write_text("".join(lines))
+    os.replace(partial, directory / name)
+
+    for stale in sorted(directory.glob("*.collapsed"), reverse=True)[settings.PROFILE_KEEP:]:
+        stale.unlink(missing_ok=True)
+
+def list_profiles() -> List[dict]:
+    """Saved reports, newest first"""
+    profiles = []
+    for path in sorted(Path(settings.PROFILE_DIR).glob("*.collapsed"), reverse=True):
+        match = PROFILE_NAME.match(path.name)
+        if not match:
+            continue
+        profiles.append({
+            "name": path.name,
+            "id": match["id"],
+            "method": match["method"],
+            "route": match["route"].replace(".", "/"),
+            "duration_ms": int(match["ms"]),
+            "created_at": datetime.strptime(match["created"], "%Y%m%dT%H%M%S%f"),
+            "size": path.stat().st_size,
+        })
+    return profiles
+
+def profile_path(name: str) -> Optional[Path]:
+    """The report called name, or None (also for anything that isn't a report name)"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = Path(settings.PROFILE_DIR) / name
+    return path if path.is_file() else None
+
+class ProfilingMiddleware:
+    """Profiles requests flagged by an admin, plus every PROFILE_SAMPLE_EVERY-th request.
+    The response carries the report's id in X-Profile."""
+
+    def __init__(self, app, sample_every: int = 0, interval: float = 0.002):
+        self.app = app
+        self.sample_every = sample_every
+        self.interval = interval
+        self._requests = itertools.count(1)
+
+    def _wanted(self, scope) -> bool:
+        if self.sample_every and next(self._requests) % self.sample_every == 0:
+            return True
+        headers = dict(scope["headers"])
+        flagged = headers.get(b"x-profile", b"") not in (b"", b"0") \
+            or ("profile", "1") in parse_qsl(scope.get("query_string", b"").decode("latin-1"))
+        if not flagged:
+            return False
+        scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        return scheme.lower() == "bearer" and is_admin(token_username(token))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex[:8]
+        created = datetime.utcnow()
+        streaming = False
+
+        async def tagging_send(message):
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                # An event stream lasts as long as the client stays; there's no request to profile
+                streaming = dict(headers).get(b"content-type", b"").startswith(b"text/event-stream")
+                if streaming:
+                    sampler.stop()
+                else:
+                    message = {**message, "headers": headers + [(b"x-profile", profile_id.encode())]}
+            await send(message)
+
+        coro = self.app(scope, receive, tagging_send)
+        sampler = RequestSampler(coro, self.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await coro
+        finally:
+            sampler.stop()
+            elapsed_ms = round((time.perf_counter() - started) * 1000)
+            if not streaming and sampler.samples:
+                route = route_label(scope).replace("/", ".")  # Route templates have no dots
+                name = f"{created:%Y%m%dT%H%M%S%f}-{profile_id}-{scope['method']}-{route}-{elapsed_ms}ms.collapsed"
+                await asyncio.to_thread(write_profile, name, sampler.samples)
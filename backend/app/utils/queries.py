@@ -0,0 +1,159 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-request SQL accounting, the slow-query log and per-route query budgets.
+# Routes declare a budget with `dependencies=[Depends(query_budget(n))]`; going over it logs a
+# warning, or raises QueryBudgetExceeded when QUERY_BUDGET_STRICT is on (tests and CI), so an
+# N+1 regression fails there with a traceback at the statement that broke the budget.
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+class RequestQueries:
+    __slots__ = ("scope", "statements", "sql_seconds", "budget")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.budget: Optional[int] = None
+
+# Set per request by QueryTrackingMiddleware; engine hooks add to it
+_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+def route_label(scope) -> str:
+    # The route template, never the raw path, so that ids don't multiply metric series or log lines
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _origin(queries: Optional[RequestQueries]) -> str:
+    if queries is None:
+        return "outside a request"
+    return f"{queries.scope['method']} {route_label(queries.scope)}"
+
+def _redact(value):
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return value
+
+def redact_parameters(parameters, executemany: bool = False):
+    """Parameters fit for a log: strings and bytes become their length; ids, dates and None are kept"""
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: _redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return tuple(_redact(value) for value in parameters)
+    return parameters
+
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+def explain(conn, statement: str, parameters) -> Optional[str]:
+    """The plan for a read statement, run on conn's own DBAPI connection (so no events fire)"""
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if prefix is None or keyword not in ("SELECT", "WITH"):
+        return None
+
+    # On Postgres any failed statement aborts the whole transaction, so the EXPLAIN runs in a
+    # savepoint: if it fails, the request's own transaction carries on as if it never ran
+    savepoint = conn.dialect.name == "postgresql" and conn.in_transaction()
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT explain_plan")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT explain_plan")
+            raise
+        finally:
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT explain_plan")
+    finally:
+        cursor.close()
+
+    if conn.dialect.name == "postgresql":
+        return "\n".join(row[0] for row in rows)
+    # SQLite rows are (id, parent, notused, detail); indent each step under its parent
+    depth, lines = {0: -1}, []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+def _log_slow_query(conn, statement, parameters, executemany, elapsed, queries):
+    plan = None
+    if settings.SLOW_QUERY_EXPLAIN and not executemany:
+        try:
+            plan = explain(conn, statement, parameters)
+        except Exception as exc:  # Diagnostics must never fail the query they describe
+            plan = f"unavailable: {exc}"
+    logger.warning(
+        "Slow query: %.1f ms in %s\n%s\nparameters: %r%s",
+        elapsed * 1000, _origin(queries), statement, redact_parameters(parameters, executemany),
+        f"\nplan:\n{plan}" if plan else ""
+    )
+
+def instrument_queries(engine):
+    """Time every statement on engine (a sync Engine, or an AsyncEngine's sync_engine)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"]
+        queries = _request_queries.get()
+        if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            _log_slow_query(conn, statement, parameters, executemany, elapsed, queries)
+        if queries is None:
+            return
+        queries.statements += 1
+        queries.sql_seconds += elapsed
+        if settings.QUERY_BUDGET_STRICT and queries.budget is not None and queries.statements > queries.budget:
+            raise QueryBudgetExceeded(
+                f"{_origin(queries)} ran {queries.statements} SQL statements, over its budget of {queries.budget}"
+            )
+
+def query_budget(statements: int):
+    """Dependency declaring the most SQL statements a route may run, authentication included"""
+    async def declare_budget():
+        queries = _request_queries.get()
+        if queries is not None:
+            queries.budget = statements
+    return declare_budget
+
+class QueryTrackingMiddleware:
+    """Counts the SQL each request runs (see instrument_queries) and reports routes over budget"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        queries = RequestQueries(scope)
+        scope["queries"] = queries  # For outer middleware, which runs outside this context
+        token = _request_queries.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_queries.reset(token)
+            if queries.budget is not None and queries.statements > queries.budget:
+                logger.warning(
+                    "%s ran %d SQL statements, over its budget of %d",
+                    _origin(queries), queries.statements, queries.budget
+                )
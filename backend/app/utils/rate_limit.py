@@ -0,0 +1,66 @@
+import math
+import time
+from typing import Hashable, Tuple
+
+from fastapi import HTTPException, status
+
+from app.utils.cache import TTLCache
+
+class TokenBucketLimiter:
+    """Token buckets by key: each holds up to `capacity` tokens and regains one every `refill_seconds`.
+
+    Buckets live in a bounded LRU; one left untouched long enough to refill completely
+    expires, which is the same as being full.
+    """
+
+    def __init__(self, capacity: int, refill_seconds: float, maxsize: int = 10000):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self._buckets = TTLCache(maxsize=maxsize, ttl=capacity * refill_seconds)
+
+    def _tokens(self, key: Hashable, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return float(self.capacity)
+        tokens, updated = bucket
+        return min(self.capacity, tokens + (now - updated) / self.refill_seconds)
+
+    def retry_after(self, key: Hashable) -> float:
+        """Seconds until the key has a token again (0 if it has one now)"""
+        tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) * self.refill_seconds
+
+    def try_consume(self, key: Hashable) -> bool:
+        """Take a token if the key has one"""
+        now = time.monotonic()
+        tokens = self._tokens(key, now)
+        if tokens < 1:
+            return False
+        self._buckets.set(key, (tokens - 1, now))
+        return True
+
+    def refund(self, key: Hashable):
+        """Give back a token taken by try_consume"""
+        now = time.monotonic()
+        self._buckets.set(key, (min(self.capacity, self._tokens(key, now) + 1), now))
+
+def reserve_limits(*limits: Tuple[TokenBucketLimiter, Hashable]):
+    """Take a token from every (limiter, key) pair, or raise 429 (taking none) if any has run out.
+
+    Tokens are taken before the attempt they pay for, so a burst of concurrent attempts can't
+    all pass a check made before any of them failed; refund_limits gives them back on success.
+    """
+    taken = []
+    for limiter, key in limits:
+        if not limiter.try_consume(key):
+            refund_limits(*taken)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed attempts; try again later",
+                headers={"Retry-After": str(math.ceil(limiter.retry_after(key)))},
+            )
+        taken.append((limiter, key))
+
+def refund_limits(*limits: Tuple[TokenBucketLimiter, Hashable]):
+    for limiter, key in limits:
+        limiter.refund(key)
@@ -0,0 +1,60 @@
+from typing import Optional
+
+from sqlalchemy import delete, exists, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Post, Reaction
+from app.utils.counters import adjust_reaction_count, touch_post
+from app.utils.sql import upsert_insert
+
+# Each attempt only repeats when a concurrent request wrote the same (post, user) row in between
+MAX_ATTEMPTS = 3
+
+class PostNotFound(Exception):
+    pass
+
+async def _insert_reaction(db: AsyncSession, post_id: int, user_id: int, emoji: str) -> Optional[int]:
+    """Insert the reaction unless one already exists (or the post does not); the new row's id if written"""
+    row = select(literal(post_id), literal(user_id), literal(emoji)).where(exists().where(Post.id == post_id))
+    stmt = upsert_insert(db, Reaction).from_select(["post_id", "user_id", "emoji"], row)\
+        .on_conflict_do_nothing(index_elements=[Reaction.post_id, Reaction.user_id])\
+        .returning(Reaction.id)
+    return await db.scalar(stmt)
+
+async def write_reaction(db: AsyncSession, post_id: int, user_id: int, emoji: Optional[str], toggle: bool = False) -> str:
+    """Set (or with toggle, flip) a user's reaction on a post without reading it first.
+
+    Returns "added", "updated", "removed" or "unchanged". Every row deleted or inserted is
+    paired with one counter adjustment, so concurrent writers cannot skew the totals and
+    never trip the unique constraint.
+    """
+    for _ in range(MAX_ATTEMPTS):
+        clear = delete(Reaction).where(Reaction.post_id == post_id, Reaction.user_id == user_id)
+        if emoji is not None and not toggle:
+            # Setting the emoji the user already has leaves the row alone
+            clear = clear.where(Reaction.emoji != emoji)
+        previous = await db.scalar(clear.returning(Reaction.emoji))
+        if previous is not None:
+            await adjust_reaction_count(db, post_id, previous, -1)
+            await touch_post(db, post_id)
+
+        if emoji is None or (toggle and previous == emoji):
+            return "removed" if previous is not None else "unchanged"
+
+        reaction_id = await _insert_reaction(db, post_id, user_id, emoji)
+        if reaction_id is not None:
+            await adjust_reaction_count(db, post_id, emoji, 1, reaction_id=reaction_id)
+            if previous is None:
+                await touch_post(db, post_id)
+            return "updated" if previous is not None else "added"
+
+        # Nothing inserted: the reaction is already this emoji, the post is gone, or we raced
+        current = await db.scalar(select(Reaction.emoji).where(
+            Reaction.post_id == post_id, Reaction.user_id == user_id
+        ))
+        if current is None and await db.scalar(select(Post.id).where(Post.id == post_id)) is None:
+            raise PostNotFound(post_id)
+        if current == emoji and not toggle:
+            return "unchanged"
+
+    return "unchanged"
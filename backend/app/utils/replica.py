@@ -0,0 +1,70 @@
+import logging
+import time
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import new_replica_session, new_session, read_engine
+from app.utils.auth import Principal, current_principal, get_current_user
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Users who committed a write recently; their reads go to the primary until the replica catches up.
+# Kept per process, like the principal cache.
+recent_writers = TTLCache(maxsize=10000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+_replica_retry_at = 0.0
+_fallbacks = 0
+
+def _remember_writer(session: Session):
+    if session.info.get("replica"):
+        return
+    principal = current_principal.get()
+    if principal is not None:
+        recent_writers.set(principal.id, True)
+
+if read_engine is not None:
+    # Every commit on a primary session during an authenticated request, whichever route made it
+    event.listen(Session, "after_commit", _remember_writer)
+
+async def _open_replica_session():
+    """A replica session with its connection checked out, or None if the replica can't be reached"""
+    global _replica_retry_at, _fallbacks
+    if time.monotonic() < _replica_retry_at:
+        _fallbacks += 1
+        return None
+
+    db = new_replica_session()
+    try:
+        await db.connection()
+    except (DBAPIError, OSError):
+        await db.close()
+        _replica_retry_at = time.monotonic() + settings.READ_REPLICA_RETRY_SECONDS
+        _fallbacks += 1
+        logger.warning("Read replica unavailable; reading from the primary for %ss", settings.READ_REPLICA_RETRY_SECONDS)
+        return None
+    return db
+
+async def get_read_db(current_user: Principal = Depends(get_current_user)):
+    """Session for read-only routes: the replica, unless the user wrote recently or it is down"""
+    db = None
+    if read_engine is not None and recent_writers.get(current_user.id) is None:
+        db = await _open_replica_session()
+    if db is None:
+        db = new_session()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+def replica_stats() -> dict:
+    return {
+        "replica": read_engine is not None,
+        "replica_available": time.monotonic() >= _replica_retry_at,
+        "sticky_users": recent_writers.stats()["size"],
+        "fallbacks": _fallbacks,
+    }
@@ -0,0 +1,17 @@
+from app.config import BACKEND_DIR
+
+ALEMBIC_INI = BACKEND_DIR / "alembic.ini"
+
+def alembic_config():
+    # Imported here so that importing the app doesn't pay for Alembic
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    return config
+
+def upgrade_schema(revision: str = "head"):
+    """Apply pending migrations (blocking; the lifespan hook runs it in a thread)"""
+    from alembic import command
+
+    command.upgrade(alembic_config(), revision)
@@ -0,0 +1,202 @@
+import gzip
+from contextvars import ContextVar
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+try:
+    import msgpack
+except ImportError:  # Optional: without it every client gets JSON
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # Optional: without it compression falls back to gzip
+    brotli = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+JSON_MEDIA_TYPE = "application/json"
+
+# Set per request by ContentNegotiationMiddleware
+_wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+def _msgpack_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+class NegotiatedResponse(ORJSONResponse):
+    """orjson by default, msgpack when the client sent Accept: application/msgpack"""
+
+    def render(self, content: Any) -> bytes:
+        if msgpack is not None and _wants_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return msgpack.packb(content, default=_msgpack_default)
+        return super().render(content)
+
+def unvalidated(content: Any, response: Optional[Response] = None) -> NegotiatedResponse:
+    """Return content as-is, skipping response_model validation.
+
+    Only for hot paths whose dicts are built to match their response_model exactly; the model
+    still documents the endpoint. Headers set on the injected Response are carried over.
+    """
+    if response is None:
+        return NegotiatedResponse(content)
+    headers = {
+        key: value for key, value in response.headers.items()
+        if key not in ("content-length", "content-type")
+    }
+    return NegotiatedResponse(content, status_code=response.status_code or 200, headers=headers)
+
+def negotiated_media_type() -> str:
+    """The media type NegotiatedResponse renders for the current request"""
+    return MSGPACK_MEDIA_TYPE if msgpack is not None and _wants_msgpack.get() else JSON_MEDIA_TYPE
+
+def _qualities(header: str) -> Dict[str, float]:
+    """Accept-style header as {token: q}; a q that doesn't parse counts as 0"""
+    qualities = {}
+    for part in header.lower().split(","):
+        token, *params = (piece.strip() for piece in part.split(";"))
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[token] = max(quality, qualities.get(token, 0.0))
+    return qualities
+
+def _wants_msgpack_for(accept: str) -> bool:
+    """msgpack only when named explicitly, and weighted at least as high as JSON"""
+    qualities = _qualities(accept)
+    msgpack_quality = qualities.get(MSGPACK_MEDIA_TYPE, 0.0)
+    json_quality = max(qualities.get(media_range, 0.0) for media_range in (JSON_MEDIA_TYPE, "application/*", "*/*"))
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+def _add_vary(headers: List[Tuple[bytes, bytes]], field: bytes) -> List[Tuple[bytes, bytes]]:
+    """headers with field added to Vary (merged into an existing Vary header)"""
+    for index, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if field.lower() not in (item.strip().lower() for item in value.split(b",")):
+                headers = [*headers[:index], (key, value + b", " + field), *headers[index + 1:]]
+            return headers
+    return [*headers, (b"vary", field)]
+
+class ContentNegotiationMiddleware:
+    """Records whether the client accepts msgpack, for NegotiatedResponse.
+
+    JSON responses and 304s carry Vary: Accept, so that shared caches keep the two
+    representations apart.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or msgpack is None:
+            return await self.app(scope, receive, send)
+
+        async def varying_send(message):
+            if message["type"] == "http.response.start":
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if message["status"] == 304 \
+                        or content_type.startswith((JSON_MEDIA_TYPE.encode(), MSGPACK_MEDIA_TYPE.encode())):
+                    message = {**message, "headers": _add_vary(list(message.get("headers", [])), b"Accept")}
+            await send(message)
+
+        accept = dict(scope["headers"]).get(b"accept", b"").decode("latin-1")
+        token = _wants_msgpack.set(_wants_msgpack_for(accept))
+        try:
+            await self.app(scope, receive, varying_send)
+        finally:
+            _wants_msgpack.reset(token)
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """The best encoding the client accepts (q > 0), preferring brotli on ties"""
+    qualities = _qualities(accept_encoding)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+class CompressionMiddleware:
+    """gzip/brotli for complete response bodies of at least minimum_size bytes.
+
+    Streaming responses (server-sent events, file downloads) pass through untouched, since
+    compressing them would buffer output that clients expect immediately. Every body large
+    enough to compress carries Vary: Accept-Encoding, compressed or not.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = _accepted_encoding(dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1"))
+        start = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                passthrough = b"content-encoding" in headers \
+                    or headers.get(b"content-type", b"").startswith(b"text/event-stream")
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streamed body: send the held start line and everything after it unchanged
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) < self.minimum_size:
+                # Includes empty bodies (304, HEAD), whose headers must stay as they are
+                await send(start)
+                await send(message)
+                return
+
+            headers = _add_vary(list(start.get("headers", [])), b"Accept-Encoding")
+            if encoding is not None:
+                body = self._compress(body, encoding)
+                headers = [(k, v) for k, v in headers if k != b"content-length"]
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
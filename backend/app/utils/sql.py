@@ -0,0 +1,9 @@
+from sqlalchemy.dialects import sqlite
+
+def upsert_insert(db, table):
+    """INSERT construct with ON CONFLICT support for the session's dialect (Postgres or SQLite)"""
+    if db.get_bind().dialect.name == "postgresql":
+        # Imported on first use: the Postgres dialect is slow to import and SQLite setups never need it
+        from sqlalchemy.dialects import postgresql
+        return postgresql.insert(table)
+    return sqlite.insert(table)
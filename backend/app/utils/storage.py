@@ -0,0 +1,214 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import time
+import uuid
+from io import BytesIO
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Optional
+
+import cloudinary
+import cloudinary.exceptions
+import cloudinary.uploader
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.images import sniff_image_extension
+
+CHUNK_SIZE = 256 * 1024
+
+# Configure Cloudinary
+if settings.CLOUDINARY_CLOUD_NAME:
+    cloudinary.config(
+        cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+        api_key=settings.CLOUDINARY_API_KEY,
+        api_secret=settings.CLOUDINARY_API_SECRET
+    )
+
+class StorageTimeout(Exception):
+    pass
+
+class StorageBackend(ABC):
+    """Stores an image and returns its public URL. save() blocks and is run off the event loop;
+    past deadline (a time.monotonic() value) it gives up, storing nothing, with StorageTimeout."""
+
+    @abstractmethod
+    def save(self, data: BinaryIO, folder: str, filename: Optional[str] = None, extension: str = ".png",
+             deadline: Optional[float] = None) -> str:
+        ...
+
+class CloudinaryStorage(StorageBackend):
+    def save(self, data: BinaryIO, folder: str, filename: Optional[str] = None, extension: str = ".png",
+             deadline: Optional[float] = None) -> str:
+        if not settings.CLOUDINARY_CLOUD_NAME:
+            # Return placeholder if Cloudinary not configured
+            return f"https://via.placeholder.com/400x300?text={folder}"
+
+        options = {"folder": f"bachaboard/{folder}", "resource_type": "image"}
+        if filename:
+            options["public_id"] = filename
+        if deadline is not None:
+            options["timeout"] = max(deadline - time.monotonic(), 0.1)
+        try:
+            result = cloudinary.uploader.upload(data, **options)
+        except cloudinary.exceptions.Error as exc:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise StorageTimeout() from exc
+            raise
+        return result["secure_url"]
+
+class LocalStorage(StorageBackend):
+    """Writes files under MEDIA_ROOT, served by the app at MEDIA_URL"""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def save(self, data: BinaryIO, folder: str, filename: Optional[str] = None, extension: str = ".png",
+             deadline: Optional[float] = None) -> str:
+        name = f"{filename or uuid.uuid4().hex}{extension}"
+        directory = self.root / folder
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary name first so readers never see a partial file
+        partial = directory / f".{name}.{uuid.uuid4().hex}.part"
+        try:
+            with open(partial, "wb") as out:
+                while chunk := data.read(CHUNK_SIZE):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise StorageTimeout()
+                    out.write(chunk)
+            os.replace(partial, directory / name)
+        finally:
+            partial.unlink(missing_ok=True)
+
+        return f"{self.base_url}/{folder}/{name}"
+
+def get_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.MEDIA_ROOT, settings.MEDIA_URL)
+    return CloudinaryStorage()
+
+storage = get_storage()
+
+# Bounds how many uploads are in flight to the backend at once
+_upload_slots = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the upload limit of {settings.MAX_UPLOAD_BYTES} bytes"
+    )
+
+async def _store(data: BinaryIO, folder: str, filename: Optional[str] = None, extension: str = ".png") -> str:
+    async with _upload_slots:
+        # The backend enforces the timeout itself rather than being abandoned by wait_for, so the
+        # slot stays held until its thread is done and a timed-out upload leaves nothing behind
+        deadline = time.monotonic() + settings.UPLOAD_TIMEOUT_SECONDS
+        try:
+            return await run_in_threadpool(storage.save, data, folder, filename, extension, deadline)
+        except StorageTimeout:
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Image upload timed out")
+
+async def _upload_chunks(file: UploadFile):
+    """Yield an upload's bytes in chunks, failing as soon as it exceeds MAX_UPLOAD_BYTES"""
+    if file.size is not None and file.size > settings.MAX_UPLOAD_BYTES:
+        raise _too_large()
+
+    received = 0
+    while chunk := await file.read(CHUNK_SIZE):
+        received += len(chunk)
+        if received > settings.MAX_UPLOAD_BYTES:
+            raise _too_large()
+        yield chunk
+
+async def read_upload(file: UploadFile) -> bytes:
+    """Read a whole upload into memory, enforcing MAX_UPLOAD_BYTES"""
+    return b"".join([chunk async for chunk in _upload_chunks(file)])
+
+async def upload_image(file: UploadFile, folder: str = "bachaboard") -> str:
+    """Stream an uploaded image to storage in chunks and return its URL"""
+    with SpooledTemporaryFile(max_size=CHUNK_SIZE * 4) as spooled:
+        async for chunk in _upload_chunks(file):
+            spooled.write(chunk)
+        spooled.seek(0)
+
+        # The extension comes from the content, never the client's filename: local storage
+        # serves files same-origin, and an .html or .svg there would run as the site
+        extension = sniff_image_extension(spooled.read(16))
+        if extension is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Only PNG, JPEG, GIF and WebP images are allowed"
+            )
+        spooled.seek(0)
+
+        return await _store(spooled, folder, extension=extension)
+
+async def upload_drawing(image_buffer: BytesIO, filename: str) -> str:
+    """Upload a rendered drawing and return its URL"""
+    if image_buffer.getbuffer().nbytes > settings.MAX_UPLOAD_BYTES:
+        raise _too_large()
+    return await _store(image_buffer, "drawings", filename=filename)
+
+class UploadLimitMiddleware:
+    """Rejects multipart bodies over MAX_UPLOAD_BYTES before they are fully received"""
+
+    def __init__(self, app, max_body: int):
+        self.app = app
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body:
+            return await self._reject(send)
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if exceeded:
+                # The app turned the aborted body into its own error; answer 413 instead
+                if not response_started:
+                    response_started = True
+                    await self._reject(send)
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await self._reject(send)
+
+    async def _reject(self, send):
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({"type": "http.response.body", "body": b'{"detail":"Request body too large"}'})
+
+class _BodyTooLarge(Exception):
+    pass
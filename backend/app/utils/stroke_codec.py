@@ -0,0 +1,171 @@
+"""Compact binary container for canvas state (Post.drawing_data).
+
+The frontend saves react-canvas-draw state: {"lines": [{"points": [{"x", "y"}, ...],
+"brushColor", "brushRadius"}], "width", "height"}. That shape is stored as varints:
+coordinates quantized to 1/10 px and delta-encoded per line, colors interned in a
+table, the whole thing zlib-compressed. Anything else is stored as compressed JSON
+text so no input is ever rejected; that includes states with NaN, Infinity or numbers too
+large to quantize (json.loads accepts them), which come back exactly as they were sent.
+
+Container: MAGIC (3 bytes) | version (1) | kind (1) | zlib payload
+"""
+import json
+import math
+import zlib
+from typing import List, Optional, Tuple
+
+MAGIC = b"BBD"
+VERSION = 1
+KIND_JSON = 0
+KIND_STROKES = 1
+SCALE = 10  # Quantization steps per pixel
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _write_signed(out: bytearray, value: int):
+    _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def _read_signed(data: bytes, pos: int) -> Tuple[int, int]:
+    value, pos = _read_varint(data, pos)
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+
+def _quantize(value) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("not a number")
+    scaled = value * SCALE
+    if isinstance(scaled, float) and not math.isfinite(scaled):
+        raise ValueError("not a finite number")
+    return round(scaled)
+
+def _dequantize(value: int):
+    return value // SCALE if value % SCALE == 0 else value / SCALE
+
+def _encode_strokes(state) -> Optional[bytes]:
+    """Binary payload for canvas state, or None if state is not in the expected shape"""
+    if not isinstance(state, dict) or not set(state) <= {"lines", "width", "height"} or "lines" not in state:
+        return None
+    lines = state["lines"]
+    if not isinstance(lines, list):
+        return None
+
+    out = bytearray()
+    try:
+        # Presence flags, then canvas size
+        _write_varint(out, ("width" in state) | ("height" in state) << 1)
+        for key in ("width", "height"):
+            if key in state:
+                _write_signed(out, _quantize(state[key]))
+
+        colors: List[str] = []
+        color_index = {}
+        body = bytearray()
+        for line in lines:
+            if not isinstance(line, dict) or set(line) != {"points", "brushColor", "brushRadius"}:
+                return None
+            color = line["brushColor"]
+            if not isinstance(color, str) or not isinstance(line["points"], list):
+                return None
+            if color not in color_index:
+                color_index[color] = len(colors)
+                colors.append(color)
+
+            _write_varint(body, color_index[color])
+            _write_signed(body, _quantize(line["brushRadius"]))
+            _write_varint(body, len(line["points"]))
+            prev_x = prev_y = 0
+            for point in line["points"]:
+                if not isinstance(point, dict) or set(point) != {"x", "y"}:
+                    return None
+                x, y = _quantize(point["x"]), _quantize(point["y"])
+                _write_signed(body, x - prev_x)
+                _write_signed(body, y - prev_y)
+                prev_x, prev_y = x, y
+    except ValueError:
+        return None
+
+    _write_varint(out, len(colors))
+    for color in colors:
+        encoded = color.encode()
+        _write_varint(out, len(encoded))
+        out += encoded
+    _write_varint(out, len(lines))
+    return bytes(out + body)
+
+def _decode_strokes(data: bytes) -> dict:
+    flags, pos = _read_varint(data, 0)
+    state = {}
+    for bit, key in ((1, "width"), (2, "height")):
+        if flags & bit:
+            value, pos = _read_signed(data, pos)
+            state[key] = _dequantize(value)
+
+    color_count, pos = _read_varint(data, pos)
+    colors = []
+    for _ in range(color_count):
+        length, pos = _read_varint(data, pos)
+        colors.append(data[pos:pos + length].decode())
+        pos += length
+
+    line_count, pos = _read_varint(data, pos)
+    lines = []
+    for _ in range(line_count):
+        color, pos = _read_varint(data, pos)
+        radius, pos = _read_signed(data, pos)
+        point_count, pos = _read_varint(data, pos)
+        points = []
+        x = y = 0
+        for _ in range(point_count):
+            dx, pos = _read_signed(data, pos)
+            dy, pos = _read_signed(data, pos)
+            x, y = x + dx, y + dy
+            points.append({"x": _dequantize(x), "y": _dequantize(y)})
+        lines.append({"points": points, "brushColor": colors[color], "brushRadius": _dequantize(radius)})
+
+    # Match the key order react-canvas-draw writes
+    return {"lines": lines, **state}
+
+def is_encoded(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:3]) == MAGIC
+
+def encode(drawing_data: str) -> bytes:
+    """Pack a canvas state JSON string into the binary container"""
+    payload, kind = None, KIND_JSON
+    try:
+        payload = _encode_strokes(json.loads(drawing_data))
+    except ValueError:
+        pass
+    if payload is not None:
+        kind = KIND_STROKES
+    else:
+        payload = drawing_data.encode()
+    return MAGIC + bytes([VERSION, kind]) + zlib.compress(payload, 9)
+
+def decode(value) -> str:
+    """Canvas state JSON string from a container (legacy plain-text values pass through)"""
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not is_encoded(value):
+        return value.decode()
+
+    version, kind = value[3], value[4]
+    if version != VERSION:
+        raise ValueError(f"Unsupported drawing data version {version}")
+    payload = zlib.decompress(value[5:])
+    if kind == KIND_STROKES:
+        return json.dumps(_decode_strokes(payload), separators=(",", ":"))
+    return payload.decode()
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from sqlalchemy import delete, desc, exists, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import new_session
+from app.models import Post, TimelineEntry, HighFanoutAuthor
+from app.models.user import followers
+from app.utils.feed import feed_query
+from app.utils.pagination import keyset_before
+from app.utils.sql import upsert_insert
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_COLUMNS = ["user_id", "post_id", "author_id", "created_at"]
+
+def _insert_entries(db: AsyncSession, rows):
+    """INSERT ... SELECT into timelines, skipping rows a concurrent fan-out or backfill already added"""
+    return upsert_insert(db, TimelineEntry).from_select(TIMELINE_COLUMNS, rows).on_conflict_do_nothing()
+
+async def is_high_fanout(db: AsyncSession, author_id: int) -> bool:
+    return await db.get(HighFanoutAuthor, author_id) is not None
+
+async def fan_out_post(db: AsyncSession, post: Post):
+    """Insert a new post into its author's timeline and, unless they are high-fanout, their followers'"""
+    await db.execute(insert(TimelineEntry).values(
+        user_id=post.author_id, post_id=post.id, author_id=post.author_id, created_at=post.created_at
+    ))
+    if await is_high_fanout(db, post.author_id):
+        return
+
+    follower_rows = select(
+        followers.c.follower_id, literal(post.id), literal(post.author_id), literal(post.created_at)
+    ).where(followers.c.followed_id == post.author_id, followers.c.follower_id != post.author_id).distinct()
+    await db.execute(_insert_entries(db, follower_rows))
+
+async def backfill_follow(db: AsyncSession, viewer_id: int, author_ids: List[int]):
+    """Copy newly followed authors' posts into the follower's timeline"""
+    high_fanout = set(await db.scalars(
+        select(HighFanoutAuthor.author_id).where(HighFanoutAuthor.author_id.in_(author_ids))
+    ))
+    fan_out_ids = [author_id for author_id in author_ids if author_id not in high_fanout]
+    if fan_out_ids:
+        author_posts = select(literal(viewer_id), Post.id, Post.author_id, Post.created_at)\
+            .where(Post.author_id.in_(fan_out_ids))
+        await db.execute(_insert_entries(db, author_posts))
+
+    # Once an author crosses the threshold, stop fanning out their posts
+    if fan_out_ids:
+        crossed = await db.scalars(
+            select(followers.c.followed_id)
+            .where(followers.c.followed_id.in_(fan_out_ids))
+            .group_by(followers.c.followed_id)
+            .having(func.count() > settings.TIMELINE_FANOUT_MAX_FOLLOWERS)
+        )
+        db.add_all([HighFanoutAuthor(author_id=author_id) for author_id in crossed])
+
+async def prune_unfollow(db: AsyncSession, viewer_id: int, author_ids: List[int]):
+    """Remove unfollowed authors' posts from a former follower's timeline"""
+    await db.execute(delete(TimelineEntry).where(
+        TimelineEntry.user_id == viewer_id, TimelineEntry.author_id.in_(author_ids)
+    ))
+
+# A high-fanout author goes back to fan-out only once well under the threshold, so that an
+# author hovering around it doesn't rewrite every follower's timeline on each follow and unfollow
+DEMOTE_BELOW = 0.9
+
+async def recovered_authors(db: AsyncSession) -> List[int]:
+    """High-fanout authors whose follower count has fallen well under the threshold"""
+    follower_count = select(func.count()).where(followers.c.followed_id == HighFanoutAuthor.author_id)\
+        .scalar_subquery()
+    return list(await db.scalars(select(HighFanoutAuthor.author_id).where(
+        follower_count < settings.TIMELINE_FANOUT_MAX_FOLLOWERS * DEMOTE_BELOW
+    )))
+
+async def demote_high_fanout(db: AsyncSession, author_ids: List[int]):
+    """Fan authors out again: their posts from while they were merged at read time go into their
+    followers' timelines (which hold at most TIMELINE_FANOUT_MAX_FOLLOWERS of them)"""
+    await db.execute(delete(HighFanoutAuthor).where(HighFanoutAuthor.author_id.in_(author_ids)))
+    already_present = exists().where(
+        TimelineEntry.user_id == followers.c.follower_id, TimelineEntry.post_id == Post.id
+    )
+    follower_posts = select(followers.c.follower_id, Post.id, Post.author_id, Post.created_at)\
+        .join(followers, followers.c.followed_id == Post.author_id)\
+        .where(Post.author_id.in_(author_ids), followers.c.follower_id != Post.author_id, ~already_present)
+    await db.execute(_insert_entries(db, follower_posts))
+
+async def demote_recovered_authors() -> List[int]:
+    """Demote every recovered author, one transaction each. Demotion copies an author's posts
+    into all of their followers' timelines, so it runs here rather than in the unfollow request."""
+    async with new_session() as db:
+        author_ids = await recovered_authors(db)
+    for author_id in author_ids:
+        async with new_session() as db:
+            await demote_high_fanout(db, [author_id])
+            await db.commit()
+    return author_ids
+
+async def run_demotions():
+    while True:
+        await asyncio.sleep(settings.TIMELINE_DEMOTE_INTERVAL_SECONDS)
+        try:
+            await demote_recovered_authors()
+        except Exception:
+            logger.exception("Failed to demote high-fanout authors")
+
+async def timeline_page(
+    db: AsyncSession, viewer_id: int, limit: int, skip: int = 0, cursor: Optional[str] = None,
+    version_only: bool = False
+) -> List[Post]:
+    """Read a page of the home timeline: one range scan plus a merge of followed high-fanout authors"""
+    fanned_out = feed_query(version_only)\
+        .join(TimelineEntry, TimelineEntry.post_id == Post.id)\
+        .where(TimelineEntry.user_id == viewer_id)\
+        .order_by(desc(TimelineEntry.created_at), desc(TimelineEntry.post_id))
+
+    followed_high_fanout = select(followers.c.followed_id)\
+        .join(HighFanoutAuthor, HighFanoutAuthor.author_id == followers.c.followed_id)\
+        .where(followers.c.follower_id == viewer_id)
+    merged = feed_query(version_only)\
+        .where(Post.author_id.in_(followed_high_fanout), Post.author_id != viewer_id)\
+        .order_by(desc(Post.created_at), desc(Post.id))
+
+    # Cursor mode seeks past the last seen (created_at, id); skip is the legacy offset mode
+    if cursor:
+        fanned_out = fanned_out.where(keyset_before(TimelineEntry.created_at, TimelineEntry.post_id, cursor))
+        merged = merged.where(keyset_before(Post.created_at, Post.id, cursor))
+        skip = 0
+
+    # Each source is already ordered, so the first skip + limit rows of each are enough
+    window = skip + limit
+    posts = {post.id: post for post in await db.scalars(fanned_out.limit(window))}
+    for post in await db.scalars(merged.limit(window)):
+        posts.setdefault(post.id, post)
+
+    ordered = sorted(posts.values(), key=lambda p: (p.created_at, p.id), reverse=True)
+    return ordered[skip:window]
+
+def rebuild_timelines(db: Session) -> int:
+    """Recompute every timeline and the high-fanout author set from posts and follows"""
+    db.execute(delete(TimelineEntry))
+    db.execute(delete(HighFanoutAuthor))
+
+    over_threshold = select(followers.c.followed_id)\
+        .group_by(followers.c.followed_id)\
+        .having(func.count() > settings.TIMELINE_FANOUT_MAX_FOLLOWERS)
+    db.execute(insert(HighFanoutAuthor).from_select(["author_id"], over_threshold))
+
+    own_posts = select(Post.author_id.label("user_id"), Post.id, Post.author_id, Post.created_at)
+    db.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "author_id", "created_at"], own_posts
+    ))
+
+    high_fanout_ids = select(HighFanoutAuthor.author_id)
+    followed_posts = select(followers.c.follower_id, Post.id, Post.author_id, Post.created_at)\
+        .join(followers, followers.c.followed_id == Post.author_id)\
+        .where(followers.c.follower_id != Post.author_id, Post.author_id.not_in(high_fanout_ids))\
+        .distinct()
+    db.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "author_id", "created_at"], followed_posts
+    ))
+
+    return db.scalar(select(func.count()).select_from(TimelineEntry))
@@ -0,0 +1,53 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.config import settings
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_password_pool: Optional[ThreadPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Worker processes for CPU-heavy work that would otherwise hold the GIL and the event loop"""
+    global _process_pool
+    if _process_pool is None:
+        # spawn rather than fork: the parent runs an event loop and database driver threads
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+async def run_in_process(fn, *args):
+    """Run a picklable function in the worker process pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_process_pool(), fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool for the next caller
+        shutdown_workers()
+        raise
+
+def get_password_pool() -> ThreadPoolExecutor:
+    """Threads for bcrypt, which releases the GIL; the size caps concurrent hashing CPU"""
+    global _password_pool
+    if _password_pool is None:
+        _password_pool = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+        )
+    return _password_pool
+
+async def run_password_hash(fn, *args):
+    """Run a password hash or verify call on the bounded password pool"""
+    return await asyncio.get_running_loop().run_in_executor(get_password_pool(), fn, *args)
+
+def shutdown_workers():
+    global _process_pool, _password_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+    if _password_pool is not None:
+        _password_pool.shutdown(wait=False, cancel_futures=True)
+        _password_pool = None
@@ -0,0 +1,9 @@
+"""Endpoint benchmarks against a synthetic database of any size.
+
+From backend/:
+
+    python -m benchmarks.generate --database-url sqlite:///bench.db --users 10000 --posts 1000000
+    python -m benchmarks.run --database-url sqlite:///bench.db --scenarios feed users follow comments
+
+Results are written to benchmarks/results/ as JSON; pass one to --baseline to compare runs.
+"""
@@ -0,0 +1,200 @@
+"""Fill an empty database with synthetic users, follows, posts, reactions and comments.
+
+Built for scale (10k users, 1M posts, 10M reactions): rows go in through batched Core inserts
+with explicit ids, every user shares one precomputed password hash, and the counters
+(comments_count, post_reaction_counts) are computed while generating instead of afterwards.
+Popularity follows a Zipf distribution with exponent --skew: low user ids have most of the
+followers, write most of the posts and collect most of the reactions and comments.
+
+    python -m benchmarks.generate --database-url sqlite:///bench.db \\
+        --users 10000 --posts 1000000 --reactions 10000000 --comments 2000000 --follows 100
+
+Every user's password is "bench" and usernames are bench1, bench2, ...
+"""
+import os
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+BENCH_PASSWORD = "bench"
+EMOJIS = ["❤️", "😀", "🎨", "🔥", "👏"]
+BATCH_POSTS = 5000
+
+def username(user_id: int) -> str:
+    return f"bench{user_id}"
+
+def zipf_weights(count: int, skew: float) -> List[float]:
+    """Cumulative weights for ranks 1..count (rank 1 is the most popular), for random.choices"""
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+def _follow_rows(rng: random.Random, users: int, follows: int, cumulative: List[float]):
+    user_ids = range(1, users + 1)
+    for follower_id in user_ids:
+        # Out-degree varies around the mean; targets are drawn by popularity
+        wanted = min(users - 1, users // 2, rng.randint(0, 2 * follows))
+        followed = set()
+        while len(followed) < wanted:
+            followed.update(rng.choices(user_ids, cum_weights=cumulative, k=wanted - len(followed)))
+            followed.discard(follower_id)
+        for followed_id in followed:
+            yield {"follower_id": follower_id, "followed_id": followed_id}
+
+def _batched(rows, size: int):
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+def generate(users: int, posts: int, reactions: int, comments: int, follows: int, skew: float,
+             days: int, seed: int):
+    from sqlalchemy import func, insert, select, text
+    from sqlalchemy.orm import Session
+    from app.config import settings
+    from app.database import engine
+    from app.models import Comment, Post, PostReactionCount, PostType, Reaction, User, ThemeType
+    from app.models.user import followers
+    from app.utils.auth import get_password_hash
+    from app.utils.schema import upgrade_schema
+    from app.utils.timeline import rebuild_timelines
+
+    upgrade_schema()
+    with engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(User)):
+            raise SystemExit("⚠️  The database already has users; generate into an empty one")
+
+    rng = random.Random(seed)
+    cumulative = zipf_weights(users, skew)
+    user_ids = range(1, users + 1)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+
+    def progress(label: str, done: int, total: int):
+        print(f"\r  {label}: {done:,}/{total:,} ({time.perf_counter() - started:.0f}s)", end="", flush=True)
+
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    themes = list(ThemeType)
+    with engine.begin() as conn:
+        for batch in _batched(({
+            "id": user_id,
+            "username": username(user_id),
+            "hashed_password": hashed_password,
+            "display_name": f"Bench {user_id}",
+            "theme": rng.choice(themes),
+            "created_at": now - timedelta(days=days + 1),
+        } for user_id in user_ids), 10000):
+            conn.execute(insert(User), batch)
+    print(f"Users: {users:,}")
+
+    follow_count = 0
+    for batch in _batched(_follow_rows(rng, users, follows, cumulative), 50000):
+        with engine.begin() as conn:
+            conn.execute(insert(followers), batch)
+        follow_count += len(batch)
+        progress("Follows", follow_count, users * follows)
+    print()
+
+    # Reactions and comments land on posts in proportion to their author's popularity
+    author_ids = rng.choices(user_ids, cum_weights=cumulative, k=posts)
+    weight_sum = sum(1 / author_id ** skew for author_id in author_ids)
+    reactions_per_weight = reactions / weight_sum
+    comments_per_weight = comments / weight_sum
+    first_post_at = now - timedelta(days=days)
+    seconds_per_post = days * 86400 / max(posts, 1)
+
+    def randomized_round(value: float) -> int:
+        whole = int(value)
+        return whole + (rng.random() < value - whole)
+
+    reaction_id = comment_id = 0
+    for batch_start in range(0, posts, BATCH_POSTS):
+        post_rows, reaction_rows, count_rows, comment_rows = [], [], [], []
+        for post_id in range(batch_start + 1, min(batch_start + BATCH_POSTS, posts) + 1):
+            author_id = author_ids[post_id - 1]
+            weight = 1 / author_id ** skew
+            created_at = first_post_at + timedelta(seconds=(post_id - 1) * seconds_per_post)
+
+            reactors = rng.sample(user_ids, min(users, randomized_round(weight * reactions_per_weight)))
+            emoji_counts, first_ids = {}, {}
+            for user_id in reactors:
+                emoji = rng.choice(EMOJIS)
+                emoji_counts[emoji] = emoji_counts.get(emoji, 0) + 1
+                reaction_id += 1
+                first_ids.setdefault(emoji, reaction_id)
+                reaction_rows.append({
+                    "id": reaction_id, "post_id": post_id, "user_id": user_id, "emoji": emoji, "created_at": created_at
+                })
+            count_rows.extend(
+                {"post_id": post_id, "emoji": emoji, "count": count, "first_reaction_id": first_ids[emoji]}
+                for emoji, count in emoji_counts.items()
+            )
+
+            comment_count = randomized_round(weight * comments_per_weight)
+            for offset in range(comment_count):
+                comment_id += 1
+                comment_rows.append({
+                    "id": comment_id,
+                    "post_id": post_id,
+                    "author_id": rng.randint(1, users),
+                    "content": f"Comment {comment_id}",
+                    "created_at": created_at + timedelta(seconds=offset + 1),
+                })
+
+            photo = rng.random() < 0.2
+            post_rows.append({
+                "id": post_id,
+                "author_id": author_id,
+                "post_type": PostType.PHOTO if photo else PostType.TEXT,
+                "content": f"Post {post_id} by {username(author_id)}",
+                "media_url": f"https://example.com/media/{post_id}.png" if photo else None,
+                "comments_count": comment_count,
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+
+        with engine.begin() as conn:
+            conn.execute(insert(Post), post_rows)
+            if reaction_rows:
+                conn.execute(insert(Reaction), reaction_rows)
+                conn.execute(insert(PostReactionCount), count_rows)
+            if comment_rows:
+                conn.execute(insert(Comment), comment_rows)
+        progress("Posts", post_rows[-1]["id"], posts)
+    print(f"\nReactions: {reaction_id:,}, comments: {comment_id:,}")
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Ids were explicit, so move the sequences past them
+            for table in ("users", "posts", "reactions", "comments"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+                ))
+    if settings.TIMELINE_FANOUT:
+        with Session(engine) as db:
+            print(f"Timelines: {rebuild_timelines(db):,} entries")
+            db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))  # Fresh planner statistics, as a long-lived database would have
+
+    print(f"✅ Generated in {time.perf_counter() - started:.0f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--reactions", type=int, default=500000, help="Total, spread over posts by popularity")
+    parser.add_argument("--comments", type=int, default=100000, help="Total, spread over posts by popularity")
+    parser.add_argument("--follows", type=int, default=50, help="Mean users followed per user")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent; 0 makes everyone equally popular")
+    parser.add_argument("--days", type=int, default=365, help="Posts are spread over this many days")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Before the app is imported, since its settings are read at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    generate(args.users, args.posts, args.reactions, args.comments, args.follows, args.skew, args.days, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Run endpoint scenarios against a generated database and report latency and SQL per request.
+
+Each scenario runs for --duration seconds with --concurrency clients, in-process through the
+ASGI app (httpx's ASGITransport: no server, no network), each request made as a random user
+of the dataset. Reported per scenario: throughput, p50/p95/p99 latency, errors, and SQL
+statements per request as counted by the app's own query tracking. Results are saved as JSON;
+pass an earlier file to --baseline to see what changed. The follow and react scenarios write.
+
+    python -m benchmarks.generate --database-url sqlite:///bench.db
+    python -m benchmarks.run --database-url sqlite:///bench.db --scenarios feed users comments
+"""
+import os
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.generate import username
+from benchmarks.scenarios import SCENARIOS, Dataset
+from scripts.bench_concurrency import percentile
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+STATEMENTS_HEADER = "x-bench-sql-statements"
+
+def count_statements(app):
+    """Wrap app so that every response reports its SQL statement count in a header"""
+    async def counting_app(scope, receive, send):
+        async def counting_send(message):
+            # QueryTrackingMiddleware leaves its count in the scope; the handler is done by now
+            queries = scope.get("queries")
+            if message["type"] == "http.response.start" and queries is not None:
+                header = (STATEMENTS_HEADER.encode(), str(queries.statements).encode())
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+        await app(scope, receive, counting_send)
+    return counting_app
+
+def load_dataset(skew: float) -> Dataset:
+    from sqlalchemy import func, select
+    from app.database import engine
+    from app.models import Post, User
+
+    with engine.connect() as conn:
+        users = conn.scalar(select(func.max(User.id)))
+        posts = conn.scalar(select(func.max(Post.id)))
+        popular_posts = conn.scalars(select(Post.id).order_by(Post.comments_count.desc()).limit(100)).all()
+    if not users or not posts:
+        raise SystemExit("⚠️  No data; run `python -m benchmarks.generate` first")
+    return Dataset(users=users, posts=posts, popular_posts=list(popular_posts), skew=skew)
+
+def summarize(latencies: list, statements: list, errors: int, duration: float) -> dict:
+    if not latencies:
+        return {"requests": 0, "errors": errors, "rps": 0}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "sql_per_request": round(sum(statements) / len(statements), 2),
+        "sql_max": max(statements),
+    }
+
+async def run_scenario(client, name: str, dataset: Dataset, concurrency: int, duration: float,
+                       warmup: float, rng: random.Random) -> dict:
+    from app.utils.auth import create_access_token
+
+    scenario = SCENARIOS[name]
+    headers = {}
+    latencies, statements = [], []
+    errors = 0
+
+    def headers_for(user_id: int) -> dict:
+        if user_id not in headers:
+            headers[user_id] = {"Authorization": f"Bearer {create_access_token({'sub': username(user_id)})}"}
+        return headers[user_id]
+
+    async def worker(deadline: float, record: bool):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            viewer_id = dataset.random_user(rng)
+            request = scenario(rng, dataset, viewer_id)
+            started = time.perf_counter()
+            response = await client.request(request.method, request.url, json=request.json, headers=headers_for(viewer_id))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if not record:
+                continue
+            if response.status_code >= 400:
+                errors += 1
+                continue
+            latencies.append(elapsed_ms)
+            statements.append(int(response.headers.get(STATEMENTS_HEADER, 0)))
+
+    for seconds, record in ((warmup, False), (duration, True)):
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(worker(deadline, record) for _ in range(concurrency)))
+    return summarize(latencies, statements, errors, duration)
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args) -> dict:
+    import httpx
+    from app.config import settings
+    from app.database import engine
+    from app.main import app
+
+    dataset = load_dataset(args.skew)
+    rng = random.Random(args.seed)
+    results = {
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "database": {"dialect": engine.dialect.name, "users": dataset.users, "posts": dataset.posts},
+        "settings": {
+            "DATABASE_ASYNC": settings.DATABASE_ASYNC,
+            "TIMELINE_FANOUT": settings.TIMELINE_FANOUT,
+            "read_replica": bool(settings.DATABASE_READ_URL),
+        },
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "scenarios": {},
+    }
+
+    transport = httpx.ASGITransport(app=count_statements(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.scenarios:
+            print(f"  {name}...", flush=True)
+            results["scenarios"][name] = await run_scenario(
+                client, name, dataset, args.concurrency, args.duration, args.warmup, rng
+            )
+    return results
+
+def _change(new, old) -> str:
+    if not new or not old:
+        return ""
+    return f"{(new - old) / old * 100:+.0f}%"
+
+def print_report(results: dict, baseline: Optional[dict] = None):
+    print(f"\n{'scenario':<12}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'sql/req':>9}{'sql max':>9}{'errors':>8}"
+          + (f"{'req/s vs base':>15}{'p95 vs base':>13}" if baseline else ""))
+    for name, result in results["scenarios"].items():
+        line = f"{name:<12}{result['rps']:>8}{result.get('p50_ms', '-'):>9}{result.get('p95_ms', '-'):>9}" \
+               f"{result.get('p99_ms', '-'):>9}{result.get('sql_per_request', '-'):>9}" \
+               f"{result.get('sql_max', '-'):>9}{result['errors']:>8}"
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous:
+            line += f"{_change(result['rps'], previous['rps']):>15}" \
+                    f"{_change(result.get('p95_ms'), previous.get('p95_ms')):>13}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=4, help="Clients per scenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--skew", type=float, default=1.0, help="As given to benchmarks.generate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare with")
+    args = parser.parse_args()
+
+    # Before the app is imported, since its settings are read at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    results = asyncio.run(run(args))
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_report(results, baseline)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{results['started_at'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\n✅ Results saved to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.generate import EMOJIS, zipf_weights
+
+@dataclass
+class Dataset:
+    """What the scenarios need to know about the generated database"""
+    users: int
+    posts: int
+    popular_posts: List[int]  # Most commented first
+    skew: float = 1.0
+    cumulative: List[float] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.cumulative = zipf_weights(self.users, self.skew)
+
+    def random_user(self, rng: random.Random) -> int:
+        return rng.randint(1, self.users)
+
+    def popular_user(self, rng: random.Random) -> int:
+        """A user drawn by popularity, as profile visits and follows are"""
+        return rng.choices(range(1, self.users + 1), cum_weights=self.cumulative)[0]
+
+    def random_post(self, rng: random.Random) -> int:
+        return rng.randint(1, self.posts)
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    json: Optional[dict] = None
+
+# Each scenario builds one request for a viewer; the runner sends it as that viewer
+Scenario = Callable[[random.Random, Dataset, int], Request]
+
+def feed(rng, dataset, viewer_id):
+    return Request("GET", "/api/posts/feed?limit=20")
+
+def users(rng, dataset, viewer_id):
+    # The default first page, with follower counts for the page's users
+    return Request("GET", "/api/users/")
+
+def directory(rng, dataset, viewer_id):
+    return Request("GET", f"/api/users/directory?q=bench{rng.randint(1, 99)}&limit=20")
+
+def profile(rng, dataset, viewer_id):
+    return Request("GET", f"/api/users/{dataset.popular_user(rng)}")
+
+def follow(rng, dataset, viewer_id):
+    # Toggles, so a long run follows and unfollows about equally often
+    target = dataset.popular_user(rng)
+    if target == viewer_id:
+        target = target % dataset.users + 1
+    return Request("POST", f"/api/users/{target}/follow")
+
+def post(rng, dataset, viewer_id):
+    return Request("GET", f"/api/posts/{dataset.random_post(rng)}")
+
+def comments(rng, dataset, viewer_id):
+    # The most commented posts are the expensive case
+    return Request("GET", f"/api/posts/{rng.choice(dataset.popular_posts)}/comments?limit=20")
+
+def react(rng, dataset, viewer_id):
+    return Request("POST", f"/api/posts/{dataset.random_post(rng)}/react", json={"emoji": rng.choice(EMOJIS)})
+
+SCENARIOS: Dict[str, Scenario] = {
+    "feed": feed,
+    "users": users,
+    "directory": directory,
+    "profile": profile,
+    "follow": follow,
+    "post": post,
+    "comments": comments,
+    "react": react,
+}
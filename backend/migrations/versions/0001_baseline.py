@@ -0,0 +1,175 @@
+"""Baseline schema, plus the hot-path indexes
+
+Adopts databases created by the old import-time create_all as well as empty ones: missing
+tables are created, columns and counters added since then are backfilled, and every index is
+created only if absent. Run it on a database of any age with `alembic upgrade head`.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables in dependency order, as the models define them at this revision
+TABLES = [
+    ("users", lambda: [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("display_name", sa.String(), nullable=False),
+        sa.Column("theme", sa.Enum("HELLO_KITTY", "POKEMON", "NEUTRAL", name="themetype"), nullable=True),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("last_login", sa.DateTime(), nullable=True),
+    ]),
+    ("followers", lambda: [
+        sa.Column("follower_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("followed_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+    ]),
+    ("posts", lambda: [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("post_type", sa.Enum("TEXT", "PHOTO", "DRAWING", name="posttype"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("media_url", sa.String(), nullable=True),
+        sa.Column("drawing_data", sa.LargeBinary(), nullable=True),
+        sa.Column("comments_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    ]),
+    ("comments", lambda: [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("post_id", sa.Integer(), sa.ForeignKey("posts.id"), nullable=False),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    ]),
+    ("reactions", lambda: [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("post_id", sa.Integer(), sa.ForeignKey("posts.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("emoji", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("post_id", "user_id", name="_post_user_uc"),
+    ]),
+    ("post_reaction_counts", lambda: [
+        sa.Column("post_id", sa.Integer(), sa.ForeignKey("posts.id"), primary_key=True),
+        sa.Column("emoji", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    ]),
+    ("feedbacks", lambda: [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("category", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    ]),
+    ("timeline_entries", lambda: [
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("post_id", sa.Integer(), sa.ForeignKey("posts.id"), primary_key=True),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    ]),
+    ("high_fanout_authors", lambda: [
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+    ]),
+    ("drawing_drafts", lambda: [
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("base_data", sa.Text(), nullable=True),
+        sa.Column("base_seq", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    ]),
+    ("drawing_draft_deltas", lambda: [
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("seq", sa.Integer(), primary_key=True),
+        sa.Column("strokes", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    ]),
+]
+
+# (name, table, columns, unique); created with IF NOT EXISTS
+INDEXES = [
+    ("ix_users_id", "users", ["id"], False),
+    ("ix_users_username", "users", ["username"], True),
+    ("ix_users_username_lower", "users", [sa.text("lower(username)")], False),
+    ("ix_users_display_name_lower", "users", [sa.text("lower(display_name)")], False),
+    ("ix_followers_followed_follower", "followers", ["followed_id", "follower_id"], False),
+    ("ix_posts_id", "posts", ["id"], False),
+    ("ix_posts_author_created", "posts", ["author_id", "created_at", "id"], False),
+    ("ix_comments_id", "comments", ["id"], False),
+    ("ix_comments_post_created", "comments", ["post_id", "created_at", "id"], False),
+    ("ix_reactions_id", "reactions", ["id"], False),
+    ("ix_feedbacks_id", "feedbacks", ["id"], False),
+    ("ix_timeline_user_created", "timeline_entries", ["user_id", "created_at", "post_id"], False),
+    ("ix_timeline_user_author", "timeline_entries", ["user_id", "author_id"], False),
+    # New in this revision: the feedback list reads one user's rows, and Postgres doesn't index
+    # foreign keys itself, so reaction and comment lookups by user would scan the whole table
+    ("ix_feedbacks_user_created", "feedbacks", ["user_id", "created_at"], False),
+    ("ix_reactions_user_id", "reactions", ["user_id"], False),
+    ("ix_comments_author_id", "comments", ["author_id"], False),
+]
+
+def _rebuild_followers():
+    """Early databases have a followers table without a primary key; rebuild it without duplicates"""
+    op.execute("DROP INDEX IF EXISTS ix_followers_followed_follower")
+    op.execute("DROP INDEX IF EXISTS ix_followers_follower_id")
+    op.rename_table("followers", "followers_old")
+    op.create_table("followers", *dict(TABLES)["followers"]())
+    op.execute(
+        "INSERT INTO followers (follower_id, followed_id) "
+        "SELECT DISTINCT follower_id, followed_id FROM followers_old "
+        "WHERE follower_id IS NOT NULL AND followed_id IS NOT NULL"
+    )
+    op.drop_table("followers_old")
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = set(inspector.get_table_names())
+
+    for name, columns in TABLES:
+        if name not in existing:
+            op.create_table(name, *columns())
+
+    if "followers" in existing and not inspector.get_pk_constraint("followers")["constrained_columns"]:
+        _rebuild_followers()
+
+    if "posts" in existing:
+        post_columns = {c["name"]: c for c in inspector.get_columns("posts")}
+        if "comments_count" not in post_columns:
+            op.add_column("posts", sa.Column("comments_count", sa.Integer(), nullable=False, server_default="0"))
+            op.execute(
+                "UPDATE posts SET comments_count = "
+                "(SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id)"
+            )
+        # Drawings are stored through the binary stroke codec; Postgres needs BYTEA for that
+        # (scripts/migrate_drawing_data.py re-encodes existing rows, which stay readable meanwhile)
+        if bind.dialect.name == "postgresql" and not isinstance(post_columns["drawing_data"]["type"], sa.LargeBinary):
+            op.execute("ALTER TABLE posts ALTER COLUMN drawing_data TYPE BYTEA USING convert_to(drawing_data, 'UTF8')")
+
+    if "reactions" in existing and "post_reaction_counts" not in existing:
+        op.execute(
+            "INSERT INTO post_reaction_counts (post_id, emoji, count) "
+            "SELECT post_id, emoji, COUNT(*) FROM reactions GROUP BY post_id, emoji"
+        )
+
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+def downgrade() -> None:
+    for name, _ in reversed(TABLES):
+        op.drop_table(name)
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TYPE IF EXISTS posttype")
+        op.execute("DROP TYPE IF EXISTS themetype")
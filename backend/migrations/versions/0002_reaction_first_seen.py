@@ -0,0 +1,32 @@
+"""Order reaction summaries as the emojis first appeared
+
+post_reaction_counts gains first_reaction_id, the id of the earliest reaction with that emoji,
+so summaries keep the order they had when they were built from the reactions themselves.
+
+Revision ID: 0002_reaction_first_seen
+Revises: 0001_baseline
+Create Date: 2026-10-17 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_reaction_first_seen"
+down_revision: Union[str, None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column("post_reaction_counts", sa.Column("first_reaction_id", sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE post_reaction_counts SET first_reaction_id = "
+        "(SELECT MIN(id) FROM reactions WHERE reactions.post_id = post_reaction_counts.post_id "
+        "AND reactions.emoji = post_reaction_counts.emoji)"
+    )
+
+def downgrade() -> None:
+    with op.batch_alter_table("post_reaction_counts") as batch:
+        batch.drop_column("first_reaction_id")
@@ -1,6 +1,10 @@
 import uvicorn
-import os
+
+from app.config import settings
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port)
\ No newline at end of file
+    uvicorn.run(
+        "app.main:app", host="0.0.0.0", port=settings.PORT,
+        # Without this every client appears as the proxy, sharing one login rate-limit bucket
+        proxy_headers=True, forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS
+    )
\ No newline at end of file
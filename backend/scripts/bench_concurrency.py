@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Compare request latency under parallel load with DATABASE_ASYNC off and on.
+
+Concurrent feed readers run alongside a probe that calls /api/auth/me every
+10 ms. /api/auth/me needs no query once the principal is cached, so its
+latency is a direct measure of how long the event loop is blocked: with the
+blocking driver the probe waits behind every feed query, with the async
+driver it should not.
+
+    python scripts/bench_concurrency.py --posts 50000 --concurrency 8
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import subprocess
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def seed(database_url: str, users: int, posts: int):
+    os.environ["DATABASE_URL"] = database_url
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app.database import engine, Base
+    from app.models import User, Post, PostType
+    from app.models.user import followers
+
+    Base.metadata.create_all(bind=engine)
+    start = datetime.utcnow() - timedelta(days=30)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"bench{i}", "hashed_password": "x", "display_name": f"Bench {i}"}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(followers), [
+            {"follower_id": 1, "followed_id": i} for i in range(2, users + 1)
+        ])
+        conn.execute(insert(Post), [
+            {
+                "author_id": i % users + 1,
+                "post_type": PostType.TEXT,
+                "content": f"post {i}",
+                "comments_count": 0,
+                "created_at": start + timedelta(seconds=i)
+            } for i in range(posts)
+        ])
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run_load(concurrency: int, duration: float) -> dict:
+    import httpx
+    from app.main import app
+    from app.utils.auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench1'})}"}
+    feed_latencies, probe_latencies = [], []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/api/auth/me", headers=headers)  # Warm the principal cache
+        deadline = time.perf_counter() + duration
+
+        async def feed_reader():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/api/posts/feed?limit=100", headers=headers)
+                response.raise_for_status()
+                feed_latencies.append((time.perf_counter() - started) * 1000)
+
+        async def probe():
+            # Open-loop: latency counts from the scheduled send time, so time spent
+            # waiting for a blocked event loop is included
+            scheduled = time.perf_counter()
+            while scheduled < deadline:
+                await asyncio.sleep(max(0, scheduled - time.perf_counter()))
+                response = await client.get("/api/auth/me", headers=headers)
+                response.raise_for_status()
+                probe_latencies.append((time.perf_counter() - scheduled) * 1000)
+                scheduled += 0.01
+
+        await asyncio.gather(probe(), *(feed_reader() for _ in range(concurrency)))
+
+    return {
+        "feed_rps": round(len(feed_latencies) / duration, 1),
+        "feed": {"p50_ms": round(percentile(feed_latencies, 50), 2), "p99_ms": round(percentile(feed_latencies, 99), 2)},
+        "me": {"p50_ms": round(percentile(probe_latencies, 50), 2), "p99_ms": round(percentile(probe_latencies, 99), 2)},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel feed readers")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per mode")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_load(args.concurrency, args.duration))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        print(f"Seeding {args.users} users and {args.posts} posts...")
+        seed(database_url, args.users, args.posts)
+
+        results = {}
+        for mode in ("false", "true"):
+            env = dict(os.environ, DATABASE_URL=database_url, DATABASE_ASYNC=mode)
+            output = subprocess.run(
+                [sys.executable, __file__, "--child",
+                 "--concurrency", str(args.concurrency), "--duration", str(args.duration)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"\n{'DATABASE_ASYNC':<16}{'feed/s':>8}{'feed p50':>10}{'feed p99':>10}{'me p50':>10}{'me p99':>10}")
+    for mode, result in results.items():
+        print(f"{mode:<16}{result['feed_rps']:>8}"
+              f"{result['feed']['p50_ms']:>10}{result['feed']['p99_ms']:>10}"
+              f"{result['me']['p50_ms']:>10}{result['me']['p99_ms']:>10}")
+
+if __name__ == "__main__":
+    main()
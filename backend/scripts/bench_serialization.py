@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Time the feed response encode path at several page sizes.
+
+Compares FastAPI's previous default (response_model validation, then stdlib json) with
+validation + orjson, the unvalidated orjson fast path, and msgpack, then reports
+compressed sizes. No database is needed; pages are synthetic PostResponse dicts.
+
+    python scripts/bench_serialization.py --sizes 20 100 500
+"""
+import sys
+import os
+import argparse
+import asyncio
+import gzip
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import PostType
+from app.routers.posts import PostResponse
+from app.utils.serialization import brotli, msgpack, _msgpack_default
+
+EMOJIS = ["❤️", "😀", "🎨", "🔥", "👏"]
+
+def make_page(size: int) -> List[dict]:
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": i,
+            "author_id": i % 50,
+            "author_name": f"Artist {i % 50}",
+            "author_avatar": f"https://example.com/avatars/{i % 50}.png",
+            "post_type": random.choice(list(PostType)),
+            "content": "Sketch of the day " * random.randint(1, 8),
+            "media_url": f"https://example.com/drawings/{i}.png",
+            "created_at": start + timedelta(minutes=i),
+            "comments_count": random.randint(0, 40),
+            "reactions": [{"emoji": e, "count": random.randint(1, 30)} for e in random.sample(EMOJIS, 3)],
+            "user_reaction": random.choice(EMOJIS + [None]),
+        } for i in range(size)
+    ]
+
+async def time_per_call(fn, seconds: float) -> float:
+    """Mean milliseconds per call of an async fn, repeated for roughly `seconds`"""
+    await fn()  # Warm up
+    calls, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        await fn()
+        calls += 1
+    return (time.perf_counter() - started) * 1000 / calls
+
+async def run(sizes: List[int], seconds: float):
+    field = create_response_field(name="Response_get_feed", type_=List[PostResponse])
+
+    print(f"{'posts':>6}  {'path':<22}{'ms/response':>12}{'bytes':>10}")
+    for size in sizes:
+        page = make_page(size)
+        bodies = {}
+
+        async def validated_json():
+            content = await serialize_response(field=field, response_content=page)
+            bodies["validated + json"] = JSONResponse(content).body
+
+        async def validated_orjson():
+            content = await serialize_response(field=field, response_content=page)
+            bodies["validated + orjson"] = ORJSONResponse(content).body
+
+        async def unvalidated_orjson():
+            bodies["unvalidated + orjson"] = ORJSONResponse(page).body
+
+        async def unvalidated_msgpack():
+            bodies["unvalidated + msgpack"] = msgpack.packb(page, default=_msgpack_default)
+
+        paths = [validated_json, validated_orjson, unvalidated_orjson]
+        if msgpack is not None:
+            paths.append(unvalidated_msgpack)
+
+        for path in paths:
+            ms = await time_per_call(path, seconds)
+            name = path.__name__.replace("_", " + ", 1)
+            print(f"{size:>6}  {name:<22}{ms:>12.3f}{len(bodies[name]):>10}")
+
+        json_body = bodies["unvalidated + orjson"]
+        encoders = [("gzip", lambda body: gzip.compress(body, compresslevel=6))]
+        if brotli is not None:
+            encoders.append(("br", lambda body: brotli.compress(body, quality=4)))
+        for encoding, compress in encoders:
+            started = time.perf_counter()
+            compressed = compress(json_body)
+            ms = (time.perf_counter() - started) * 1000
+            print(f"{size:>6}  {'orjson + ' + encoding:<22}{ms:>12.3f}{len(compressed):>10}")
+        print()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent on each path")
+    args = parser.parse_args()
+
+    random.seed(0)
+    asyncio.run(run(args.sizes, args.seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Compare SQLite's rollback journal with the WAL profile under concurrent reads and writes.
+
+Feed readers and comment writers hit the app together (async driver, one connection per
+session). In rollback-journal mode a committing writer locks readers out, so read latency
+spikes with every write; in WAL mode readers keep going. Each profile runs on its own copy
+of the same seeded database, created under --dir (use a real disk, not tmpfs, or fsync costs
+vanish and synchronous=FULL looks free).
+
+    python scripts/bench_sqlite.py --readers 8 --writers 4 --duration 10
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.bench_concurrency import percentile, seed
+
+# Settings overrides per profile; "rollback" matches the engine defaults before WAL was added
+PROFILES = {
+    "rollback": {
+        "SQLITE_JOURNAL_MODE": "delete",
+        "SQLITE_SYNCHRONOUS": "full",
+        "SQLITE_CACHE_SIZE_KB": "2000",
+        "SQLITE_MMAP_SIZE_BYTES": "0",
+    },
+    "wal": {},
+}
+
+def summarize(latencies: list, duration: float) -> dict:
+    if not latencies:
+        return {"rps": 0, "p50_ms": None, "p99_ms": None}
+    return {
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+async def run_load(readers: int, writers: int, duration: float, posts: int) -> dict:
+    import httpx
+    from app.main import app
+    from app.utils.auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench1'})}"}
+    read_latencies, write_latencies = [], []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/api/auth/me", headers=headers)  # Warm the principal cache
+        deadline = time.perf_counter() + duration
+
+        async def timed(latencies: list, request):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                response = await request()
+                response.raise_for_status()
+            except Exception:  # "database is locked" surfaces as an app exception or a 500
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        async def reader():
+            while time.perf_counter() < deadline:
+                await timed(read_latencies, lambda: client.get("/api/posts/feed?limit=50", headers=headers))
+
+        async def writer():
+            while time.perf_counter() < deadline:
+                post_id = random.randint(1, posts)
+                await timed(write_latencies, lambda: client.post(
+                    f"/api/posts/{post_id}/comment", json={"content": "bench"}, headers=headers
+                ))
+
+        await asyncio.gather(*(reader() for _ in range(readers)), *(writer() for _ in range(writers)))
+
+    return {
+        "read": summarize(read_latencies, duration),
+        "write": summarize(write_latencies, duration),
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile")
+    parser.add_argument("--dir", default=".", help="Where to create the benchmark databases")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(run_load(args.readers, args.writers, args.duration, args.posts))
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory(dir=args.dir, prefix="bench-sqlite-") as tmp:
+        template = os.path.join(tmp, "template.db")
+        print(f"Seeding {args.users} users and {args.posts} posts...")
+        os.environ.update(PROFILES["rollback"])  # Leave the template in rollback mode, with no -wal file
+        seed(f"sqlite:///{template}", args.users, args.posts)
+
+        results = {}
+        for profile, overrides in PROFILES.items():
+            database = os.path.join(tmp, f"{profile}.db")
+            shutil.copyfile(template, database)
+            env = {key: value for key, value in os.environ.items() if not key.startswith("SQLITE_")}
+            env.update(overrides, DATABASE_URL=f"sqlite:///{database}", DATABASE_ASYNC="true", MIGRATE_ON_STARTUP="false")
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", "--posts", str(args.posts),
+                 "--readers", str(args.readers), "--writers", str(args.writers), "--duration", str(args.duration)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            results[profile] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"\n{'profile':<10}{'reads/s':>9}{'read p50':>10}{'read p99':>10}"
+          f"{'writes/s':>10}{'write p50':>11}{'write p99':>11}{'errors':>8}")
+    for profile, result in results.items():
+        read, write = result["read"], result["write"]
+        print(f"{profile:<10}{read['rps']:>9}{read['p50_ms']:>10}{read['p99_ms']:>10}"
+              f"{write['rps']:>10}{write['p50_ms']:>11}{write['p99_ms']:>11}{result['errors']:>8}")
+
+if __name__ == "__main__":
+    main()
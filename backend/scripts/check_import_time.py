@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Check that importing the app stays fast and free of side effects.
+
+Every cold start and every forked worker pays for `import app.main`, so this times it in a
+fresh interpreter (python -X importtime) against a budget, lists the slowest modules, and
+fails if the import opened the database. Suitable as a CI step:
+
+    python scripts/check_import_time.py --budget-ms 1500
+"""
+import sys
+import os
+import argparse
+import re
+import subprocess
+import tempfile
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+def measure(module: str, env: dict) -> list:
+    """(self_us, cumulative_us, name) for every module the import loaded"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        sys.exit(f"⚠️  import {module} failed")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), name))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=3, help="Best of this many fresh interpreters")
+    parser.add_argument("--top", type=int, default=15, help="Slowest packages to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Point the app at a database that doesn't exist; importing must not create it
+        database_path = os.path.join(tmp, "import-check.db")
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}"}
+
+        runs = [measure(args.module, env) for _ in range(args.runs)]
+        touched_database = os.path.exists(database_path)
+
+    best = min(runs, key=lambda rows: next(r[1] for r in rows if r[2] == args.module))
+    total_ms = next(r[1] for r in best if r[2] == args.module) / 1000
+
+    # Self time summed per top-level package shows where the import actually goes
+    by_package = {}
+    for self_us, _, name in best:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    print(f"{'ms':>8}  package")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>8.1f}  {package}")
+    print()
+
+    failed = False
+    if touched_database:
+        print(f"⚠️  import {args.module} opened the database; schema work belongs in the lifespan hook")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"⚠️  import {args.module} took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"✅ import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms), no database access")
+
+if __name__ == "__main__":
+    main()
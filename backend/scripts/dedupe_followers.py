@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+from app.models.user import followers
+
+def main():
+    """Rebuild the followers table with its composite primary key, dropping duplicate edges"""
+
+    if inspect(engine).get_pk_constraint("followers")["constrained_columns"]:
+        print("✅ followers already has a primary key; nothing to do")
+        return
+
+    with engine.begin() as conn:
+        before = conn.scalar(text("SELECT COUNT(*) FROM followers"))
+
+        # Move the old table aside (its indexes would clash with the new table's names)
+        for index in followers.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_followers_follower_id"))
+        conn.execute(text("ALTER TABLE followers RENAME TO followers_old"))
+
+        followers.create(conn)
+        conn.execute(text(
+            "INSERT INTO followers (follower_id, followed_id) "
+            "SELECT DISTINCT follower_id, followed_id FROM followers_old "
+            "WHERE follower_id IS NOT NULL AND followed_id IS NOT NULL"
+        ))
+        conn.execute(text("DROP TABLE followers_old"))
+
+        after = conn.scalar(text("SELECT COUNT(*) FROM followers"))
+
+    print(f"✅ Rebuilt followers: {after} edges kept, {before - after} duplicate or empty edges removed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+from app.utils import stroke_codec
+
+def ensure_binary_column():
+    """Postgres stores the old JSON text column as TEXT; the codec needs BYTEA"""
+    if engine.dialect.name != "postgresql":
+        return  # SQLite columns accept blobs regardless of declared type
+    column = next(c for c in inspect(engine).get_columns("posts") if c["name"] == "drawing_data")
+    if column["type"].__class__.__name__.upper() != "BYTEA":
+        with engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE posts ALTER COLUMN drawing_data TYPE BYTEA USING convert_to(drawing_data, 'UTF8')"
+            ))
+        print("✅ Converted posts.drawing_data to BYTEA")
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-encode Post.drawing_data with the binary stroke codec")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    ensure_binary_column()
+
+    converted = skipped = before_bytes = after_bytes = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, drawing_data FROM posts "
+                "WHERE drawing_data IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": args.batch_size}).all()
+            if not rows:
+                break
+
+            updates = []
+            for post_id, value in rows:
+                if stroke_codec.is_encoded(value):
+                    skipped += 1
+                    continue
+                raw = value if isinstance(value, str) else bytes(value).decode()
+                encoded = stroke_codec.encode(raw)
+                before_bytes += len(raw.encode())
+                after_bytes += len(encoded)
+                updates.append({"id": post_id, "data": encoded})
+
+            if updates:
+                conn.execute(text("UPDATE posts SET drawing_data = :data WHERE id = :id"), updates)
+            converted += len(updates)
+            last_id = rows[-1][0]
+
+    print(f"✅ Converted {converted} drawings ({skipped} already encoded)")
+    if converted:
+        saved = 100 * (1 - after_bytes / before_bytes) if before_bytes else 0
+        print(f"Size: {before_bytes:,} bytes -> {after_bytes:,} bytes ({saved:.1f}% smaller)")
+
+if __name__ == "__main__":
+    main()
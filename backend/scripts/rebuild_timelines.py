@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import engine
+from app.utils.schema import upgrade_schema
+from app.utils.timeline import rebuild_timelines
+
+def main():
+    """Rebuild every materialized home timeline from posts and follows"""
+
+    # Bring the schema up to date (including the timeline tables on older databases)
+    upgrade_schema()
+
+    db = Session(engine)
+    try:
+        entries = rebuild_timelines(db)
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"Rebuilt timelines: {entries} entries")
+    if not settings.TIMELINE_FANOUT:
+        print("⚠️  TIMELINE_FANOUT is off; the feed will not read these until it is enabled.")
+
+if __name__ == "__main__":
+    main()
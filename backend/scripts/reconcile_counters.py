@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import Session
+from app.database import engine
+from app.utils.counters import reconcile_counters
+from app.utils.schema import upgrade_schema
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute post comment and reaction counters")
+    parser.add_argument("--dry-run", action="store_true", help="Report drift without rewriting counters")
+    args = parser.parse_args()
+
+    # The counter table and posts.comments_count arrive with the baseline migration
+    upgrade_schema()
+
+    db = Session(engine)
+    try:
+        drift = reconcile_counters(db, apply=not args.dry_run)
+        db.commit()
+    finally:
+        db.close()
+
+    for post_id, counter, stored, actual in drift:
+        print(f"Post {post_id}: {counter} stored={stored} actual={actual}")
+
+    if not drift:
+        print("✅ All counters match their source tables")
+    elif args.dry_run:
+        print(f"\n⚠️  {len(drift)} counters drifted (dry run, nothing changed)")
+    else:
+        print(f"\n✅ Fixed {len(drift)} drifted counters")
+
+if __name__ == "__main__":
+    main()
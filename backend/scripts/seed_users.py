@@ -4,15 +4,16 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy.orm import Session
-from app.database import engine, Base
+from app.database import engine
 from app.models import User, ThemeType
 from app.utils.auth import get_password_hash
+from app.utils.schema import upgrade_schema
 
 def create_initial_users():
     """Create initial user accounts and set up follow relationships"""
 
     # Create all tables
-    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
 
     db = Session(engine)
 
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Settings are read once, when app.config is first imported, so everything the tests depend on
+# is set here, before any test module imports the app
+_tmp = Path(tempfile.mkdtemp(prefix="bachaboard-tests-"))
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp / 'test.db'}",
+    DATABASE_READ_URL="",
+    STORAGE_BACKEND="local",
+    MEDIA_ROOT=str(_tmp / "media"),
+    PROFILE_DIR=str(_tmp / "profiles"),
+    BCRYPT_ROUNDS="4",
+    QUERY_BUDGET_STRICT="true",
+)
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    from app.utils.schema import upgrade_schema
+
+    upgrade_schema()
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def make_user():
+    """Creates a user with a unique name; returns its id, username, password and auth headers"""
+    from sqlalchemy.orm import Session
+    from app.database import engine
+    from app.models import User
+    from app.utils.auth import create_access_token, get_password_hash
+
+    def make(password: str = "secret") -> SimpleNamespace:
+        username = f"user-{uuid.uuid4().hex[:8]}"
+        with Session(engine) as db:
+            user = User(username=username, hashed_password=get_password_hash(password), display_name=username)
+            db.add(user)
+            db.commit()
+            user_id = user.id
+        token = create_access_token({"sub": username})
+        return SimpleNamespace(
+            id=user_id, username=username, password=password, headers={"Authorization": f"Bearer {token}"}
+        )
+    return make
+
+@pytest.fixture
+async def client():
+    """An HTTP client for the app, in-process (the lifespan hook doesn't run)"""
+    import httpx
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from app.utils.drafts import DraftSequenceError, DraftStore
+
+pytestmark = pytest.mark.anyio
+
+def line(x):
+    return {"points": [{"x": x, "y": x}], "brushColor": "#000", "brushRadius": 5}
+
+def xs(draft: dict) -> list:
+    return [stroke["points"][0]["x"] for stroke in json.loads(draft["drawing_data"])["lines"]]
+
+async def test_deltas_append_in_sequence(make_user):
+    store, user = DraftStore(), make_user()
+    assert await store.append(user.id, 1, [line(1)], base={"lines": []}) == 1
+    assert await store.append(user.id, 2, [line(2)]) == 2
+
+    draft = await store.resume(user.id)
+    assert draft["seq"] == 2
+    assert xs(draft) == [1, 2]
+
+async def test_retried_delta_is_stored_once(make_user):
+    store, user = DraftStore(), make_user()
+    await store.append(user.id, 1, [line(1)])
+    assert await store.append(user.id, 1, [line(1)]) == 1
+    assert xs(await store.resume(user.id)) == [1]
+
+async def test_gap_asks_for_the_full_canvas(make_user):
+    store, user = DraftStore(), make_user()
+    await store.append(user.id, 1, [line(1)])
+    with pytest.raises(DraftSequenceError) as error:
+        await store.append(user.id, 3, [line(3)])
+    assert error.value.expected_seq == 2
+
+async def test_base_with_a_restarted_counter_replaces_the_draft(make_user):
+    store, user = DraftStore(), make_user()
+    for seq in (1, 2, 3):
+        await store.append(user.id, seq, [line(seq)])
+
+    # A new tab starts again from 1 with its own canvas
+    assert await store.append(user.id, 1, [], base={"lines": [line(42)]}) == 1
+    assert await store.append(user.id, 2, [line(43)]) == 2
+
+    draft = await store.resume(user.id)
+    assert draft["seq"] == 2
+    assert xs(draft) == [42, 43]
+
+async def test_sequence_survives_a_flush_and_a_restart(make_user):
+    store, user = DraftStore(), make_user()
+    await store.append(user.id, 1, [line(1)])
+    await store.flush_due(force=True)
+
+    # Once flushed (and idle), the sequence continues from what was written...
+    with pytest.raises(DraftSequenceError) as error:
+        await store.append(user.id, 3, [line(3)])
+    assert error.value.expected_seq == 2
+    assert await store.append(user.id, 2, [line(2)]) == 2
+    await store.flush_due(force=True)
+
+    # ...including for a store that has never seen the user, as after a restart
+    restarted = DraftStore()
+    assert await restarted.append(user.id, 3, [line(3)]) == 3
+    assert xs(await restarted.resume(user.id)) == [1, 2, 3]
+
+async def test_discard(make_user):
+    store, user = DraftStore(), make_user()
+    await store.append(user.id, 1, [line(1)])
+    await store.discard(user.id)
+    assert await store.resume(user.id) == {"seq": 0, "drawing_data": None}
+    assert await store.append(user.id, 1, [line(1)]) == 1
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine
+from app.models import Post, PostType
+from app.models.user import followers
+
+pytestmark = pytest.mark.anyio
+
+def edges(follower_id: int, followed_id: int) -> int:
+    with Session(engine) as db:
+        return db.scalar(select(func.count()).select_from(followers).where(
+            followers.c.follower_id == follower_id, followers.c.followed_id == followed_id
+        ))
+
+@pytest.mark.parametrize("fanout", [False, True])
+async def test_concurrent_follow_taps(client, make_user, monkeypatch, fanout):
+    monkeypatch.setattr(settings, "TIMELINE_FANOUT", fanout)
+    viewer, author = make_user(), make_user()
+    with Session(engine) as db:
+        db.add_all([Post(author_id=author.id, post_type=PostType.TEXT, content=f"p{i}") for i in range(3)])
+        db.commit()
+
+    for _ in range(5):
+        # Two taps that can both see the same state; whichever way they interleave, neither fails
+        # and the feed agrees with the edge that is left
+        responses = await asyncio.gather(*(
+            client.post(f"/api/users/{author.id}/follow", headers=viewer.headers) for _ in range(2)
+        ))
+        assert [r.status_code for r in responses] == [200, 200]
+
+        following = edges(viewer.id, author.id)
+        feed = await client.get("/api/posts/feed", headers=viewer.headers)
+        assert feed.status_code == 200
+        assert len([p for p in feed.json() if p["author_id"] == author.id]) == 3 * following
+
+async def test_follow_then_unfollow(client, make_user):
+    viewer, author = make_user(), make_user()
+    url = f"/api/users/{author.id}/follow"
+
+    assert (await client.post(url, headers=viewer.headers)).json()["message"].startswith("Now following")
+    assert edges(viewer.id, author.id) == 1
+    assert (await client.post(url, headers=viewer.headers)).json()["message"].startswith("Unfollowed")
+    assert edges(viewer.id, author.id) == 0
+
+async def test_cannot_follow_yourself(client, make_user):
+    viewer = make_user()
+    response = await client.post(f"/api/users/{viewer.id}/follow", headers=viewer.headers)
+    assert response.status_code == 400
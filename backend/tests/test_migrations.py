@@ -0,0 +1,138 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+
+from app.database import Base
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def alembic(database_url: str, *args: str):
+    subprocess.run(
+        [sys.executable, "-m", "alembic", *args],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": database_url}, check=True, capture_output=True,
+    )
+
+def legacy_schema() -> sa.MetaData:
+    """The tables as the old import-time create_all made them"""
+    metadata = sa.MetaData()
+    sa.Table(
+        "users", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("username", sa.String, unique=True, index=True, nullable=False),
+        sa.Column("hashed_password", sa.String, nullable=False),
+        sa.Column("display_name", sa.String, nullable=False),
+        sa.Column("theme", sa.Enum("HELLO_KITTY", "POKEMON", "NEUTRAL", name="themetype")),
+        sa.Column("avatar_url", sa.String),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("last_login", sa.DateTime),
+    )
+    sa.Table(
+        "followers", metadata,
+        sa.Column("follower_id", sa.Integer, sa.ForeignKey("users.id")),
+        sa.Column("followed_id", sa.Integer, sa.ForeignKey("users.id")),
+    )
+    sa.Table(
+        "posts", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("author_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("post_type", sa.Enum("TEXT", "PHOTO", "DRAWING", name="posttype"), nullable=False),
+        sa.Column("content", sa.Text),
+        sa.Column("media_url", sa.String),
+        sa.Column("drawing_data", sa.Text),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("updated_at", sa.DateTime),
+    )
+    sa.Table(
+        "comments", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("post_id", sa.Integer, sa.ForeignKey("posts.id"), nullable=False),
+        sa.Column("author_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content", sa.Text, nullable=False),
+        sa.Column("created_at", sa.DateTime),
+    )
+    sa.Table(
+        "reactions", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("post_id", sa.Integer, sa.ForeignKey("posts.id"), nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("emoji", sa.String, nullable=False),
+        sa.Column("created_at", sa.DateTime),
+        sa.UniqueConstraint("post_id", "user_id", name="_post_user_uc"),
+    )
+    sa.Table(
+        "feedbacks", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("subject", sa.String, nullable=False),
+        sa.Column("message", sa.Text, nullable=False),
+        sa.Column("category", sa.String),
+        sa.Column("created_at", sa.DateTime),
+    )
+    return metadata
+
+@pytest.fixture
+def legacy_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = sa.create_engine(url)
+    metadata = legacy_schema()
+    metadata.create_all(engine)
+    t = metadata.tables
+    with engine.begin() as conn:
+        conn.execute(t["users"].insert(), [
+            {"id": i, "username": f"u{i}", "hashed_password": "x", "display_name": f"U{i}"} for i in (1, 2, 3)
+        ])
+        # The same follow twice, as the unconstrained table allowed
+        conn.execute(t["followers"].insert(), [
+            {"follower_id": 1, "followed_id": 2},
+            {"follower_id": 1, "followed_id": 2},
+            {"follower_id": 1, "followed_id": 3},
+        ])
+        conn.execute(t["posts"].insert(), [
+            {"id": 1, "author_id": 2, "post_type": "TEXT", "content": "hello", "drawing_data": None},
+            {"id": 2, "author_id": 3, "post_type": "DRAWING", "content": None, "drawing_data": '{"lines": []}'},
+        ])
+        conn.execute(t["comments"].insert(), [
+            {"post_id": 1, "author_id": 1, "content": "a"}, {"post_id": 1, "author_id": 3, "content": "b"},
+        ])
+        conn.execute(t["reactions"].insert(), [
+            {"id": 10, "post_id": 1, "user_id": 1, "emoji": "😀"},
+            {"id": 11, "post_id": 1, "user_id": 2, "emoji": "❤️"},
+            {"id": 12, "post_id": 1, "user_id": 3, "emoji": "😀"},
+        ])
+    yield url, engine
+    engine.dispose()
+
+def test_upgrade_adopts_a_create_all_database(legacy_database):
+    url, engine = legacy_database
+    alembic(url, "upgrade", "head")
+
+    inspector = sa.inspect(engine)
+    assert set(Base.metadata.tables) <= set(inspector.get_table_names())
+    assert inspector.get_pk_constraint("followers")["constrained_columns"] == ["follower_id", "followed_id"]
+    assert "ix_followers_followed_follower" in {index["name"] for index in inspector.get_indexes("followers")}
+
+    with engine.connect() as conn:
+        assert conn.execute(sa.text("SELECT version_num FROM alembic_version")).scalar() == "0002_reaction_first_seen"
+        assert sorted(conn.execute(sa.text("SELECT follower_id, followed_id FROM followers"))) == [(1, 2), (1, 3)]
+        assert sorted(conn.execute(sa.text("SELECT id, comments_count FROM posts"))) == [(1, 2), (2, 0)]
+        assert sorted(conn.execute(sa.text(
+            "SELECT post_id, emoji, count, first_reaction_id FROM post_reaction_counts"
+        ))) == [(1, "❤️", 1, 11), (1, "😀", 2, 10)]
+
+    # Running it again finds nothing to do
+    alembic(url, "upgrade", "head")
+
+def test_upgrade_and_downgrade_an_empty_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'empty.db'}"
+    alembic(url, "upgrade", "head")
+    engine = sa.create_engine(url)
+    try:
+        assert set(Base.metadata.tables) <= set(sa.inspect(engine).get_table_names())
+        alembic(url, "downgrade", "base")
+        assert set(sa.inspect(engine).get_table_names()) == {"alembic_version"}
+    finally:
+        engine.dispose()
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def test_api_routes_win_over_the_frontend_build(tmp_path):
+    """With a frontend build mounted at /, health and metrics are still served by the API"""
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "index.html").write_text("<!doctype html>")
+
+    # STATIC_DIR is read when the app is imported, hence the fresh interpreter
+    script = textwrap.dedent("""
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        client = TestClient(app)
+        assert client.get("/").text == "<!doctype html>"
+        assert client.get("/api/health").json()["status"] == "healthy"
+        metrics = client.get("/api/metrics")
+        assert metrics.status_code == 200, metrics.status_code
+        assert metrics.headers["content-type"].startswith("text/plain")
+    """)
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "STATIC_DIR": str(static), "METRICS_ENABLED": "true", "METRICS_TOKEN": ""},
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,97 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import auth
+from app.utils import rate_limit
+from app.utils.rate_limit import TokenBucketLimiter, refund_limits, reserve_limits
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+def test_bucket_empties_and_refills(clock):
+    limiter = TokenBucketLimiter(capacity=3, refill_seconds=10)
+    assert [limiter.try_consume("k") for _ in range(4)] == [True, True, True, False]
+    assert limiter.retry_after("k") == 10
+    assert limiter.try_consume("other")
+
+    clock.now += 5
+    assert limiter.retry_after("k") == 5
+    assert not limiter.try_consume("k")
+    clock.now += 5
+    assert limiter.try_consume("k")
+    assert not limiter.try_consume("k")
+
+def test_refund_never_exceeds_capacity(clock):
+    limiter = TokenBucketLimiter(capacity=2, refill_seconds=10)
+    limiter.refund("k")
+    assert [limiter.try_consume("k") for _ in range(3)] == [True, True, False]
+
+def test_reserve_takes_every_token_or_none(clock):
+    wide = TokenBucketLimiter(capacity=5, refill_seconds=10)
+    narrow = TokenBucketLimiter(capacity=1, refill_seconds=10)
+    reserve_limits((wide, "ip"), (narrow, "user"))
+
+    with pytest.raises(HTTPException) as error:
+        reserve_limits((wide, "ip"), (narrow, "user"))
+    assert error.value.status_code == 429
+    assert error.value.headers["Retry-After"] == "10"
+    # The wide bucket's token for the refused attempt was given back
+    assert [wide.try_consume("ip") for _ in range(5)] == [True] * 4 + [False]
+
+    refund_limits((narrow, "user"))
+    reserve_limits((narrow, "user"))
+
+@pytest.mark.anyio
+async def test_concurrent_reservations_stop_at_capacity():
+    limiter = TokenBucketLimiter(capacity=5, refill_seconds=60)
+
+    async def attempt():
+        try:
+            reserve_limits((limiter, "k"))
+        except HTTPException:
+            return "refused"
+        await asyncio.sleep(0.01)  # The attempt itself, during which the others run
+        return "allowed"
+
+    outcomes = Counter(await asyncio.gather(*(attempt() for _ in range(30))))
+    assert outcomes == {"allowed": 5, "refused": 25}
+
+@pytest.fixture
+def login_limiters(monkeypatch):
+    monkeypatch.setattr(auth, "username_login_limiter", TokenBucketLimiter(capacity=5, refill_seconds=60))
+    monkeypatch.setattr(auth, "ip_login_limiter", TokenBucketLimiter(capacity=20, refill_seconds=60))
+
+@pytest.mark.anyio
+async def test_login_burst_is_cut_off_after_the_failure_budget(client, make_user, login_limiters):
+    user = make_user()
+    responses = await asyncio.gather(*(
+        client.post("/api/auth/login", data={"username": user.username, "password": "wrong"}) for _ in range(12)
+    ))
+    assert Counter(r.status_code for r in responses) == {401: 5, 429: 7}
+    assert all(int(r.headers["retry-after"]) > 0 for r in responses if r.status_code == 429)
+
+@pytest.mark.anyio
+async def test_successful_logins_spend_nothing(client, make_user, login_limiters):
+    user = make_user()
+    for _ in range(8):
+        response = await client.post("/api/auth/login", data={"username": user.username, "password": user.password})
+        assert response.status_code == 200
+
+    statuses = [
+        (await client.post("/api/auth/login", data={"username": user.username, "password": "wrong"})).status_code
+        for _ in range(6)
+    ]
+    assert statuses == [401] * 5 + [429]
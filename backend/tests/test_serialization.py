@@ -0,0 +1,83 @@
+import msgpack
+import pytest
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models import Post, PostType
+from app.utils import serialization
+from app.utils.serialization import _accepted_encoding, _add_vary, _qualities, _wants_msgpack_for
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("gzip;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("br;q=0, gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0", None),
+    ("*;q=0.1, gzip;q=0.5", "gzip"),
+    ("br;q=0, *", "gzip"),
+    ("GZIP ; Q=1", "gzip"),
+    ("gzip;q=oops", None),
+])
+def test_accepted_encoding(header, expected):
+    assert _accepted_encoding(header) == expected
+
+def test_accepted_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+    assert _accepted_encoding("br") is None
+    assert _accepted_encoding("br, gzip;q=0.1") == "gzip"
+
+def test_qualities_keep_the_highest_per_token():
+    assert _qualities("gzip;q=0.2, gzip;q=0.8, br") == {"gzip": 0.8, "br": 1.0}
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", False),
+    ("*/*", False),
+    ("application/json", False),
+    ("application/msgpack", True),
+    ("application/msgpack, application/json", True),
+    ("application/msgpack;q=0.5, application/json", False),
+    ("application/msgpack;q=0, application/json", False),
+    ("application/msgpack;q=0", False),
+    ("application/msgpack, */*;q=0.1", True),
+    ("application/msgpack;q=0.9, application/*", False),
+])
+def test_wants_msgpack_for(accept, expected):
+    assert _wants_msgpack_for(accept) is expected
+
+def test_add_vary():
+    assert _add_vary([], b"Accept") == [(b"vary", b"Accept")]
+    assert _add_vary([(b"vary", b"Origin")], b"Accept") == [(b"vary", b"Origin, Accept")]
+    assert _add_vary([(b"Vary", b"origin, accept")], b"Accept") == [(b"Vary", b"origin, accept")]
+
+@pytest.fixture
+def author(make_user):
+    author = make_user()
+    with Session(engine) as db:
+        db.add_all([
+            Post(author_id=author.id, post_type=PostType.TEXT, content=f"post {i} " + "x" * 100) for i in range(20)
+        ])
+        db.commit()
+    return author
+
+@pytest.mark.anyio
+async def test_feed_negotiation(client, author):
+    url = "/api/posts/feed"
+
+    plain = await client.get(url, headers={**author.headers, "Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert plain.headers["content-type"].startswith("application/json")
+    assert "content-encoding" not in plain.headers
+    assert {"accept", "accept-encoding"} <= {v.strip().lower() for v in plain.headers["vary"].split(",")}
+
+    packed = await client.get(url, headers={
+        **author.headers, "Accept": "application/msgpack", "Accept-Encoding": "gzip"
+    })
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert packed.headers["content-encoding"] == "gzip"
+    assert msgpack.unpackb(packed.content) == plain.json()  # httpx undoes the gzip
+    assert packed.headers["etag"] != plain.headers["etag"]
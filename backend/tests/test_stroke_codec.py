@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app.utils import stroke_codec
+from app.utils.stroke_codec import KIND_JSON, KIND_STROKES, decode, encode, is_encoded
+
+def canvas(*points, **size):
+    return {
+        "lines": [
+            {"points": [{"x": x, "y": y} for x, y in points], "brushColor": "#ff00aa", "brushRadius": 4},
+            {"points": [{"x": 0, "y": 0}], "brushColor": "#ff00aa", "brushRadius": 2.5},
+        ],
+        **size,
+    }
+
+def kind(encoded: bytes) -> int:
+    return encoded[4]
+
+@pytest.mark.parametrize("state", [
+    canvas((10, 20), (11, 22), (5, 1)),
+    canvas((10.5, 20.3), (-3.7, 0.1), width=400, height=300.5),
+    canvas(),
+    {"lines": []},
+])
+def test_canvas_state_round_trips(state):
+    encoded = encode(json.dumps(state))
+    assert is_encoded(encoded)
+    assert kind(encoded) == KIND_STROKES
+    assert json.loads(decode(encoded)) == state
+
+def test_canvas_state_is_smaller_than_its_json():
+    state = canvas(*((x * 1.5, x * 2.5) for x in range(500)))
+    text = json.dumps(state)
+    assert len(encode(text)) < len(text) / 4
+
+@pytest.mark.parametrize("text", [
+    '{"foo": 1}',
+    '{"lines": [{"points": [], "brushColor": 3, "brushRadius": 1}]}',
+    '{"lines": [{"points": [{"x": true, "y": 1}], "brushColor": "#000", "brushRadius": 1}]}',
+    "[1, 2, 3]",
+    "not json at all",
+    "",
+])
+def test_other_input_is_kept_as_text(text):
+    encoded = encode(text)
+    assert kind(encoded) == KIND_JSON
+    assert decode(encoded) == text
+
+@pytest.mark.parametrize("value", ["Infinity", "-Infinity", "NaN", "1e400", "1e308"])
+def test_values_that_cannot_be_quantized_round_trip_exactly(value):
+    text = '{"lines": [{"points": [{"x": %s, "y": 1}], "brushColor": "#000", "brushRadius": 1}]}' % value
+    encoded = encode(text)
+    assert kind(encoded) == KIND_JSON
+    assert decode(encoded) == text
+
+def test_legacy_values_pass_through():
+    assert decode('{"lines": []}') == '{"lines": []}'
+    assert decode(b'{"lines": []}') == '{"lines": []}'
+    assert decode(memoryview(encode('{"lines": []}'))) == '{"lines":[]}'
+
+def test_unknown_version_is_rejected():
+    encoded = bytearray(encode('{"lines": []}'))
+    encoded[3] = stroke_codec.VERSION + 1
+    with pytest.raises(ValueError):
+        decode(bytes(encoded))
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine
+from app.models import HighFanoutAuthor, Post, PostType, TimelineEntry
+from app.utils.timeline import demote_recovered_authors
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def fanout(monkeypatch):
+    monkeypatch.setattr(settings, "TIMELINE_FANOUT", True)
+    monkeypatch.setattr(settings, "TIMELINE_FANOUT_MAX_FOLLOWERS", 3)
+
+def add_posts(author_id: int, count: int = 3):
+    with Session(engine) as db:
+        posts = [Post(author_id=author_id, post_type=PostType.TEXT, content=f"p{i}") for i in range(count)]
+        db.add_all(posts)
+        db.commit()
+        return [post.id for post in posts]
+
+def timeline_posts(user_id: int, author_id: int) -> int:
+    with Session(engine) as db:
+        return db.scalar(select(func.count()).select_from(TimelineEntry).where(
+            TimelineEntry.user_id == user_id, TimelineEntry.author_id == author_id
+        ))
+
+def is_high_fanout(author_id: int) -> bool:
+    with Session(engine) as db:
+        return db.get(HighFanoutAuthor, author_id) is not None
+
+async def feed_posts(client, viewer, author_id: int) -> int:
+    feed = (await client.get("/api/posts/feed", headers=viewer.headers)).json()
+    return len([post for post in feed if post["author_id"] == author_id])
+
+async def test_follow_backfill_skips_rows_a_concurrent_fan_out_added(client, make_user, fanout):
+    viewer, author = make_user(), make_user()
+    post_ids = add_posts(author.id)
+    with Session(engine) as db:
+        db.add(TimelineEntry(user_id=viewer.id, post_id=post_ids[0], author_id=author.id, created_at=datetime.utcnow()))
+        db.commit()
+
+    response = await client.post(f"/api/users/{author.id}/follow", headers=viewer.headers)
+    assert response.status_code == 200
+    assert timeline_posts(viewer.id, author.id) == 3
+
+async def test_demotion_happens_outside_the_unfollow(client, make_user, fanout):
+    author = make_user()
+    fans = [make_user() for _ in range(4)]
+    for fan in fans:
+        await client.post(f"/api/users/{author.id}/follow", headers=fan.headers)
+    assert is_high_fanout(author.id)
+
+    add_posts(author.id)
+    for fan in fans[:2]:
+        await client.post(f"/api/users/{author.id}/follow", headers=fan.headers)
+
+    # The unfollows leave the author merged at read time...
+    assert is_high_fanout(author.id)
+    assert timeline_posts(fans[2].id, author.id) == 0
+    assert await feed_posts(client, fans[2], author.id) == 3
+
+    # ...until the background pass fans their posts out again
+    assert author.id in await demote_recovered_authors()
+    assert not is_high_fanout(author.id)
+    for fan in fans[2:]:
+        assert timeline_posts(fan.id, author.id) == 3
+        assert await feed_posts(client, fan, author.id) == 3
+    assert timeline_posts(fans[0].id, author.id) == 0
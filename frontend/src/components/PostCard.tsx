@@ -23,6 +23,7 @@ export default function PostCard({ post, onReaction, currentUserTheme }: PostPro
   const [showComments, setShowComments] = useState(false)
   const [comment, setComment] = useState('')
   const [comments, setComments] = useState<any[]>([])
+  const [commentsCursor, setCommentsCursor] = useState<string | undefined>()
 
   const reactionEmojis = {
     hello_kitty: ['💖', '🎀', '🌸', '⭐', '🦄'],
@@ -32,11 +33,17 @@ export default function PostCard({ post, onReaction, currentUserTheme }: PostPro
 
   const availableEmojis = reactionEmojis[currentUserTheme as keyof typeof reactionEmojis]
 
+  // Comments come a page at a time, newest first; X-Next-Cursor fetches the next (older) page
+  const fetchComments = async (cursor?: string) => {
+    const response = await axios.get(`/posts/${post.id}/comments`, { params: { cursor } })
+    setComments(previous => cursor ? [...previous, ...response.data] : response.data)
+    setCommentsCursor(response.headers['x-next-cursor'])
+  }
+
   const loadComments = async () => {
     if (!showComments) {
       try {
-        const response = await axios.get(`/posts/${post.id}/comments`)
-        setComments(response.data)
+        await fetchComments()
       } catch (error) {
         console.error('Failed to load comments:', error)
       }
@@ -44,6 +51,14 @@ export default function PostCard({ post, onReaction, currentUserTheme }: PostPro
     setShowComments(!showComments)
   }
 
+  const loadMoreComments = async () => {
+    try {
+      await fetchComments(commentsCursor)
+    } catch (error) {
+      console.error('Failed to load comments:', error)
+    }
+  }
+
   const submitComment = async (e: React.FormEvent) => {
     e.preventDefault()
     if (!comment.trim()) return
@@ -52,8 +67,7 @@ export default function PostCard({ post, onReaction, currentUserTheme }: PostPro
       await axios.post(`/posts/${post.id}/comment`, { content: comment })
       setComment('')
       // Reload comments
-      const response = await axios.get(`/posts/${post.id}/comments`)
-      setComments(response.data)
+      await fetchComments()
     } catch (error) {
       console.error('Failed to add comment:', error)
     }
@@ -138,6 +152,15 @@ export default function PostCard({ post, onReaction, currentUserTheme }: PostPro
               </div>
             ))}
 
+            {commentsCursor && (
+              <button
+                onClick={loadMoreComments}
+                className="text-sm text-blue-500 hover:text-blue-600"
+              >
+                Load older comments
+              </button>
+            )}
+
             <form onSubmit={submitComment} className="flex gap-2">
               <input
                 type="text"
@@ -15,17 +15,32 @@ interface UserProfile {
 
 export default function Profile() {
   const { user } = useAuthStore()
+  const [currentUser, setCurrentUser] = useState<UserProfile | null>(null)
   const [users, setUsers] = useState<UserProfile[]>([])
+  const [nextCursor, setNextCursor] = useState<string | undefined>()
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     fetchUsers()
   }, [])
 
+  const fetchCurrentUser = async () => {
+    if (!user) return
+    const response = await axios.get(`/users/${user.id}`)
+    setCurrentUser(response.data)
+  }
+
+  // The list is paged: one page on load, then X-Next-Cursor for each "Load more"
+  const fetchPage = async (cursor?: string) => {
+    const response = await axios.get('/users/', { params: { cursor } })
+    setUsers(previous => cursor ? [...previous, ...response.data] : response.data)
+    setNextCursor(response.headers['x-next-cursor'])
+  }
+
   const fetchUsers = async () => {
     try {
-      const response = await axios.get('/users/')
-      setUsers(response.data)
+      await Promise.all([fetchCurrentUser(), fetchPage()])
     } catch (error) {
       console.error('Failed to fetch users:', error)
     } finally {
@@ -33,10 +48,24 @@ export default function Profile() {
     }
   }
 
+  const loadMore = async () => {
+    setLoadingMore(true)
+    try {
+      await fetchPage(nextCursor)
+    } catch (error) {
+      console.error('Failed to fetch users:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const toggleFollow = async (userId: number) => {
     try {
       await axios.post(`/users/${userId}/follow`)
-      fetchUsers() // Refresh list
+      // Refresh the changed user and our own counts, keeping the pages loaded so far
+      const response = await axios.get(`/users/${userId}`)
+      setUsers(previous => previous.map(u => u.id === userId ? response.data : u))
+      await fetchCurrentUser()
     } catch (error) {
       console.error('Failed to follow/unfollow:', error)
     }
@@ -50,7 +79,6 @@ export default function Profile() {
     )
   }
 
-  const currentUser = users.find(u => u.id === user?.id)
   const otherUsers = users.filter(u => u.id !== user?.id)
 
   return (
@@ -117,6 +145,17 @@ export default function Profile() {
             </div>
           ))}
         </div>
+        {nextCursor && (
+          <div className="flex justify-center mt-4">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 rounded-lg font-medium bg-gray-200 hover:bg-gray-300 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )